@@ -0,0 +1,27 @@
+-- 菜品检索索引变更通知
+--
+-- utils/dishSearch.js 在 dish_search_index 频道上 LISTEN，收到通知后重建内存索引。
+-- 后台管理、psql 等直接修改或删除 dishes / restaurants 时由触发器发出通知；
+-- 新增菜品不触发：AI 识别入库时已经通过 addDish 增量加入索引，
+-- import_data.py 批量导入后自己发出通知。
+-- 通知在事务提交时才送达，同一事务内的多条通知会合并为一条。
+--
+-- psql -d food_recommendation -f migrations/dish_search_notify.sql
+
+CREATE OR REPLACE FUNCTION notify_dish_search_index() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('dish_search_index', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS dishes_notify_search_index ON dishes;
+CREATE TRIGGER dishes_notify_search_index
+    AFTER UPDATE OR DELETE OR TRUNCATE ON dishes
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_dish_search_index();
+
+-- 索引中带有餐厅名称和窗口号
+DROP TRIGGER IF EXISTS restaurants_notify_search_index ON restaurants;
+CREATE TRIGGER restaurants_notify_search_index
+    AFTER UPDATE OR DELETE OR TRUNCATE ON restaurants
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_dish_search_index();
@@ -1,9 +1,55 @@
 const express = require('express');
 const { query } = require('../config/database');
 const auth = require('../middleware/auth');
+const { searchDishes } = require('../utils/dishSearch');
 
 const router = express.Router();
 
+// 菜品搜索（自动补全）：支持名称前缀、子串、全拼、拼音首字母和模糊匹配
+router.get('/search', async (req, res) => {
+  try {
+    const { q, limit = 10 } = req.query;
+
+    if (!q || !String(q).trim()) {
+      return res.status(400).json({
+        success: false,
+        error: {
+          code: 'VALIDATION_ERROR',
+          message: 'Query parameter q is required'
+        }
+      });
+    }
+
+    const results = await searchDishes(q, { limit: Math.min(parseInt(limit) || 10, 50) });
+
+    res.json({
+      success: true,
+      data: {
+        dishes: results.map(({ dish, score }) => ({
+          id: dish.id,
+          name: dish.name,
+          price: dish.price,
+          restaurant: {
+            id: dish.restaurant_id,
+            name: dish.restaurant_name,
+            window_number: dish.window_number
+          },
+          score
+        }))
+      }
+    });
+  } catch (error) {
+    console.error('Search dishes error:', error);
+    res.status(500).json({
+      success: false,
+      error: {
+        code: 'INTERNAL_ERROR',
+        message: 'Internal server error'
+      }
+    });
+  }
+});
+
 // 获取菜品详情
 router.get('/:id', async (req, res) => {
   try {
@@ -2,6 +2,7 @@ const express = require('express');
 const { query } = require('../config/database');
 const auth = require('../middleware/auth');
 const { getRandomRecommendations } = require('../utils/recommendationEngine');
+const campusMap = require('../utils/campusMap');
 
 const router = express.Router();
 
@@ -165,4 +166,87 @@ router.get('/flavor-based', auth, async (req, res) => {
   }
 });
 
+// 附近的菜品：按步行距离从近到远返回满足条件的菜品
+// 位置可以是某个窗口（campus + canteen + floor + window），也可以是坐标（campus + x + y，在食堂内再加 canteen + floor）
+router.get('/nearby', auth, async (req, res) => {
+  try {
+    const { campus, canteen, floor, window: windowNumber, x, y, limit = 10, min_price, max_price, keyword } = req.query;
+
+    const hasWindow = canteen && floor && windowNumber;
+    const hasCoordinates = x !== undefined && y !== undefined && !isNaN(parseFloat(x)) && !isNaN(parseFloat(y));
+    if (!campus || (!hasWindow && !hasCoordinates)) {
+      return res.status(400).json({
+        success: false,
+        error: {
+          code: 'VALIDATION_ERROR',
+          message: 'campus and either canteen/floor/window or x/y are required'
+        }
+      });
+    }
+
+    if (!campusMap.hasCampus(campus)) {
+      return res.status(404).json({
+        success: false,
+        error: { code: 'CAMPUS_NOT_FOUND', message: 'Campus not found in campus map' }
+      });
+    }
+    // 只给了窗口时窗口必须存在；同时给了坐标时按坐标计算
+    if (!hasCoordinates && !campusMap.hasWindow(campus, canteen, floor, windowNumber)) {
+      return res.status(404).json({
+        success: false,
+        error: { code: 'WINDOW_NOT_FOUND', message: 'Window not found in campus map' }
+      });
+    }
+
+    await campusMap.ensureDishes();
+
+    const point = { campus, canteen, floor: floor ? parseInt(floor) : undefined };
+    if (hasCoordinates) {
+      point.x = parseFloat(x);
+      point.y = parseFloat(y);
+    }
+    if (hasWindow) {
+      point.window_number = windowNumber;
+    }
+
+    const minPrice = min_price !== undefined ? parseFloat(min_price) : null;
+    const maxPrice = max_price !== undefined ? parseFloat(max_price) : null;
+    const filter = (dish) => {
+      const price = parseFloat(dish.price);
+      if (minPrice !== null && price < minPrice) return false;
+      if (maxPrice !== null && price > maxPrice) return false;
+      if (keyword && !dish.dish_name.includes(keyword)) return false;
+      return true;
+    };
+
+    const results = campusMap.nearestDishes(point, { k: Math.min(Math.max(parseInt(limit) || 10, 1), 100), filter });
+
+    res.json({
+      success: true,
+      data: {
+        dishes: results.map(({ dish, window, distance }) => ({
+          dish: {
+            id: dish.dish_id,
+            name: dish.dish_name,
+            price: dish.price,
+            image_url: dish.dish_image ? `/data/${dish.dish_image}` : null
+          },
+          restaurant: {
+            id: dish.restaurant_id,
+            name: dish.restaurant_name,
+            location: `${window.campus} ${window.floor}楼 ${window.canteen} 第${window.window_number}号窗口`
+          },
+          distance: Math.round(distance)
+        }))
+      }
+    });
+  } catch (error) {
+    console.error('Nearby recommendations error:', error);
+    res.status(500).json({
+      success: false,
+      error: { code: 'INTERNAL_ERROR', message: 'Internal server error' }
+    });
+  }
+});
+
 module.exports = router;
\ No newline at end of file
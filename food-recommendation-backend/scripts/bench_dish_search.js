@@ -0,0 +1,106 @@
+// 菜品检索索引基准测试
+//
+// 用法（在项目根目录）：
+//   node scripts/bench_dish_search.js [菜品数量，默认100000]
+//
+// 用固定随机种子生成合成菜单，统计建索引耗时、内存占用以及各类查询的延迟分位数。
+// 不访问数据库：config/database 替换为空实现，不需要安装和配置 pg。
+
+const databasePath = require.resolve('../config/database');
+require.cache[databasePath] = {
+  id: databasePath,
+  filename: databasePath,
+  loaded: true,
+  exports: {
+    query: async () => {
+      throw new Error('bench_dish_search does not use the database');
+    }
+  }
+};
+
+const { DishSearchIndex } = require('../utils/dishSearch');
+
+const COUNT = parseInt(process.argv[2]) || 100000;
+const ROUNDS = 2000;
+
+const FLAVORS = ['招牌', '香辣', '麻辣', '酸辣', '红烧', '黄焖', '孜然', '番茄', '酸菜', '干煸', '鱼香', '宫保', '秘制', '特色', '经典', '剁椒', '藤椒', '椒麻', '蒜香', '咖喱'];
+const INGREDIENTS = ['牛肉', '鸡肉', '猪肉', '排骨', '鸡排', '肥牛', '羊肉', '鸭血', '豆干', '土豆', '茄子', '鸡蛋', '肉丸', '鱼丸', '腊肠', '鸡腿', '里脊', '肉沫', '虾仁', '鱿鱼'];
+const STAPLES = ['螺蛳粉', '米线', '拌面', '盖饭', '炒饭', '刀削面', '拉面', '饺子', '馄饨', '凉皮', '大盘鸡', '麻辣烫', '焖面', '炒面', '煲仔饭', '石锅拌饭', '汤粉', '酸辣粉', '肉夹馍', '土豆泥拌粉'];
+
+// 合成菜单用到的汉字的拼音。未安装 pinyin-pro 时用这张表生成拼音，拼音检索的性能照样能测到
+const PINYIN = {
+  招: 'zhao', 牌: 'pai', 香: 'xiang', 辣: 'la', 麻: 'ma', 酸: 'suan', 红: 'hong', 烧: 'shao', 黄: 'huang', 焖: 'men',
+  孜: 'zi', 然: 'ran', 番: 'fan', 茄: 'qie', 菜: 'cai', 干: 'gan', 煸: 'bian', 鱼: 'yu', 宫: 'gong', 保: 'bao',
+  秘: 'mi', 制: 'zhi', 特: 'te', 色: 'se', 经: 'jing', 典: 'dian', 剁: 'duo', 椒: 'jiao', 藤: 'teng', 蒜: 'suan',
+  咖: 'ka', 喱: 'li', 牛: 'niu', 肉: 'rou', 鸡: 'ji', 猪: 'zhu', 排: 'pai', 骨: 'gu', 肥: 'fei', 羊: 'yang', 鸭: 'ya',
+  血: 'xue', 豆: 'dou', 土: 'tu', 子: 'zi', 蛋: 'dan', 丸: 'wan', 腊: 'la', 肠: 'chang', 腿: 'tui', 里: 'li', 脊: 'ji',
+  沫: 'mo', 虾: 'xia', 仁: 'ren', 鱿: 'you', 螺: 'luo', 蛳: 'si', 粉: 'fen', 米: 'mi', 线: 'xian', 拌: 'ban',
+  面: 'mian', 盖: 'gai', 饭: 'fan', 炒: 'chao', 刀: 'dao', 削: 'xiao', 拉: 'la', 饺: 'jiao', 馄: 'hun', 饨: 'tun',
+  凉: 'liang', 皮: 'pi', 大: 'da', 盘: 'pan', 烫: 'tang', 煲: 'bao', 仔: 'zai', 石: 'shi', 锅: 'guo', 汤: 'tang',
+  夹: 'jia', 馍: 'mo', 泥: 'ni'
+};
+const tablePinyin = (name) => {
+  const syllables = Array.from(name, c => PINYIN[c] || '');
+  return { full: syllables.join(''), initials: syllables.map(s => s.charAt(0)).join('') };
+};
+
+// 可复现的伪随机数（mulberry32）
+let seed = 20250919;
+const random = () => {
+  seed = (seed + 0x6D2B79F5) | 0;
+  let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+  t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+  return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+const pick = (list) => list[Math.floor(random() * list.length)];
+
+const percentile = (sorted, p) => sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+
+const measure = (label, index, queries) => {
+  const samples = [];
+  let hits = 0;
+  for (let i = 0; i < ROUNDS; i++) {
+    const q = queries[i % queries.length];
+    const start = process.hrtime.bigint();
+    hits += index.search(q, { limit: 10 }).length;
+    samples.push(Number(process.hrtime.bigint() - start) / 1000);
+  }
+  samples.sort((a, b) => a - b);
+  console.log(`${label.padEnd(12)} p50 ${percentile(samples, 0.5).toFixed(1).padStart(7)}µs  ` +
+    `p99 ${percentile(samples, 0.99).toFixed(1).padStart(7)}µs  平均命中 ${(hits / ROUNDS).toFixed(1)}`);
+};
+
+const main = () => {
+  console.log(`生成 ${COUNT} 道合成菜品...`);
+  const dishes = [];
+  for (let i = 0; i < COUNT; i++) {
+    dishes.push({ id: i + 1, name: pick(FLAVORS) + pick(INGREDIENTS) + pick(STAPLES), price: 8 + Math.floor(random() * 20) });
+  }
+
+  const heapBefore = process.memoryUsage().heapUsed;
+  let start = process.hrtime.bigint();
+  const probe = new DishSearchIndex();
+  const index = (probe.toPinyin ? probe : new DishSearchIndex({ toPinyin: tablePinyin })).build(dishes);
+  const buildMs = Number(process.hrtime.bigint() - start) / 1e6;
+  const heapMb = (process.memoryUsage().heapUsed - heapBefore) / 1024 / 1024;
+  console.log(`建索引耗时 ${buildMs.toFixed(0)}ms，堆内存约 ${heapMb.toFixed(1)}MB，拼音${probe.toPinyin ? '使用 pinyin-pro' : '使用内置拼音表（未安装 pinyin-pro）'}`);
+
+  // 增量更新
+  start = process.hrtime.bigint();
+  for (let i = 0; i < 1000; i++) {
+    index.remove(i + 1);
+    index.add(dishes[i]);
+  }
+  console.log(`增量更新 ${((Number(process.hrtime.bigint() - start) / 1000) / 1000).toFixed(1)}µs/次（删除+添加）`);
+
+  measure('名称前缀', index, ['招', '香辣', '红烧牛', '秘制排骨', '藤椒鸡']);
+  measure('子串', index, ['螺蛳粉', '牛肉', '大盘鸡', '土豆泥', '肉拌面']);
+  measure('单字', index, ['粉', '鸡', '面']);
+  measure('模糊', index, ['螺狮粉', '香辣牛拉面', '红烧排骨盖', '麻辣鸭雪米线']);
+  measure('全拼前缀', index, ['zhao', 'xiangla', 'hongshaoniu', 'mizhi']);
+  measure('首字母', index, ['zp', 'xlnr', 'hsp', 'mlt']);
+  measure('拼音子串', index, ['luosi', 'dapanji', 'niurou', 'mixian']);
+  measure('拼音模糊', index, ['luosifeng', 'dapanjji', 'hongsaoniurou', 'xianglaniurouu']);
+};
+
+main();
@@ -0,0 +1,160 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+// 食堂步行距离索引测试
+//
+// 使用内联的站点描述，不需要数据库：config/database 替换为计数用的假 query，
+// CAMPUS_MAP_FILE 指向临时文件以测试 reload()。
+
+let queryCalls = 0;
+const fakeRows = [];
+const databasePath = require.resolve('./config/database');
+require.cache[databasePath] = {
+  id: databasePath,
+  filename: databasePath,
+  loaded: true,
+  exports: {
+    query: async () => {
+      queryCalls++;
+      await new Promise(resolve => setTimeout(resolve, 20));
+      return { rows: fakeRows };
+    }
+  }
+};
+
+// 校区 A：食堂 X 两层，入口(0,0)，楼梯(0,10)每层20米，电梯(50,10)每层5米；
+// 食堂 Y 在 100 米外，室外距离按 outdoor_factor=2 折算
+const SITE = {
+  campuses: {
+    A: {
+      outdoor_factor: 2,
+      canteens: {
+        X: {
+          entrances: [{ x: 0, y: 0 }],
+          vertical: [
+            { id: '楼梯', x: 0, y: 10, cost_per_floor: 20 },
+            { id: '电梯', x: 50, y: 10, cost_per_floor: 5 }
+          ],
+          windows: {
+            1: { 1: [10, 10], 2: [40, 10] },
+            2: { 1: [10, 10] }
+          }
+        },
+        Y: {
+          entrances: [{ x: 100, y: 0 }],
+          windows: { 1: { 1: [100, 10] } }
+        }
+      }
+    }
+  }
+};
+
+const siteFile = path.join(fs.mkdtempSync(path.join(os.tmpdir(), 'campus-map-')), 'campus_map.json');
+fs.writeFileSync(siteFile, JSON.stringify(SITE));
+process.env.CAMPUS_MAP_FILE = siteFile;
+
+const campusMap = require('./utils/campusMap');
+
+let failed = 0;
+const check = (ok, message) => {
+  console.log(`${ok ? '✅' : '❌'} ${message}`);
+  if (!ok) failed++;
+};
+const near = (a, b) => Math.abs(a - b) < 1e-3;
+
+const win = (canteen, floor, windowNumber) => ({ campus: 'A', canteen, floor, window_number: String(windowNumber) });
+const dish = (id, canteen, floor, windowNumber, price = 10) => ({
+  dish_id: id, dish_name: `菜品${id}`, price, campus: 'A', store_name: canteen, floor, window_number: String(windowNumber)
+});
+
+const testDistances = () => {
+  const x11 = win('X', 1, 1);
+  const x12 = win('X', 1, 2);
+  const x21 = win('X', 2, 1);
+
+  check(near(campusMap.windowDistance(x11, x12), 30), '同层窗口直线距离 30 米');
+  // 楼梯：10 + 20 + 10 = 40；电梯：40 + 5 + 40 = 85
+  check(near(campusMap.windowDistance(x11, x21), 40), '跨层就近走楼梯：40 米');
+  // 楼梯：40 + 20 + 10 = 70；电梯：10 + 5 + 40 = 55
+  check(near(campusMap.windowDistance(x12, x21), 55), '电梯每层代价低，离电梯近时走电梯：55 米');
+  check(campusMap.windowDistance(x11, win('X', 1, 99)) === null, '不存在的窗口返回 null');
+
+  // 窗口 -> 入口 (0,0) 约 14.14 米，室外 100 米 × 2，入口 -> 窗口 10 米
+  const cross = campusMap.windowDistance(x11, win('Y', 1, 1));
+  check(near(cross, Math.hypot(10, 10) + 200 + 10), `跨食堂按 outdoor_factor 折算室外距离：${cross.toFixed(1)} 米`);
+  check(near(campusMap.windowDistance(win('Y', 1, 1), x11), cross), '距离矩阵对称');
+};
+
+const testNearest = () => {
+  campusMap.setDishes([
+    dish(1, 'Y', 1, 1),
+    dish(2, 'X', 2, 1),
+    dish(3, 'X', 1, 2, 30),
+    dish(4, 'X', 1, 1),
+    dish(5, 'Z', 1, 1) // 不在站点描述中的食堂，忽略
+  ]);
+
+  const ids = (results) => results.map(r => r.dish.dish_id).join(',');
+  check(ids(campusMap.nearestDishes(win('X', 1, 1))) === '4,3,2,1', '从窗口出发：本窗口 > 同层 > 跨层 > 跨食堂');
+  check(ids(campusMap.nearestDishes(win('X', 1, 1), { k: 2 })) === '4,3', 'k 限制返回条数');
+  check(ids(campusMap.nearestDishes(win('X', 1, 1), { filter: d => d.price < 20 })) === '4,2,1', 'filter 过滤菜品');
+  check(ids(campusMap.nearestDishes({ campus: 'A', canteen: 'X', floor: 2, x: 10, y: 10 })) === '2,4,3,1',
+    '从任意坐标出发：同层优先');
+  check(ids(campusMap.nearestDishes({ campus: 'A', x: 100, y: -10 })) === '1,4,2,3',
+    '从室外出发：最近的食堂优先，X 食堂内按入口出发的步行距离排序');
+  check(campusMap.nearestDishes({ campus: 'B', x: 0, y: 0 }).length === 0, '未知校区没有结果');
+  check(campusMap.hasCampus('A') && !campusMap.hasCampus('B'), 'hasCampus');
+  check(campusMap.hasWindow('A', 'X', '2', '1') && !campusMap.hasWindow('A', 'X', 1, 99), 'hasWindow');
+};
+
+const testReload = () => {
+  // 食堂 Y 新开一个二楼窗口，同时加一部楼梯
+  const updated = JSON.parse(JSON.stringify(SITE));
+  updated.campuses.A.canteens.Y.vertical = [{ x: 100, y: 0, cost_per_floor: 10 }];
+  updated.campuses.A.canteens.Y.windows[2] = { 1: [100, 10] };
+  fs.writeFileSync(siteFile, JSON.stringify(updated));
+
+  const before = campusMap.getSite();
+  campusMap.reload();
+  check(campusMap.getSite() !== before && campusMap.getSite().windows.length === 5, 'reload() 读取新的站点描述');
+  check(near(campusMap.windowDistance(win('Y', 1, 1), win('Y', 2, 1)), 30), '新窗口距离：10 + 10 + 10 = 30 米');
+
+  campusMap.setDishes([...fakeRows, dish(6, 'Y', 2, 1)]);
+  check(campusMap.nearestDishes(win('Y', 2, 1), { k: 1 })[0].dish.dish_id === 6, '菜品挂到新窗口上');
+};
+
+const testEnsureDishes = async () => {
+  fakeRows.push(dish(7, 'X', 1, 1));
+  queryCalls = 0;
+  // 缓存已由 setDishes 刷新，不应查询
+  await campusMap.ensureDishes();
+  check(queryCalls === 0, '缓存未过期时不查询数据库');
+
+  const realNow = Date.now;
+  Date.now = () => realNow() + 61 * 1000;
+  try {
+    await Promise.all(Array.from({ length: 10 }, () => campusMap.ensureDishes()));
+  } finally {
+    Date.now = realNow;
+  }
+  check(queryCalls === 1, `缓存过期后并发请求共用一次查询（查询 ${queryCalls} 次）`);
+  check(campusMap.nearestDishes(win('X', 1, 1), { k: 1 })[0].dish.dish_id === 7, '刷新后使用新的菜品数据');
+};
+
+const main = async () => {
+  console.log('Testing campus map distance index...');
+  testDistances();
+  testNearest();
+  testReload();
+  await testEnsureDishes();
+
+  if (failed) {
+    console.error(`Test FAILED: ${failed} check(s) failed.`);
+    process.exitCode = 1;
+  } else {
+    console.log('Test PASSED: campus map distance index.');
+  }
+};
+
+main();
@@ -0,0 +1,256 @@
+// 菜品检索索引测试
+//
+// 使用假的拼音转换和假的 query，不需要 pinyin-pro 和数据库（安装了 pinyin-pro 时另外检查真实的转换结果）：
+// - 排名：完全匹配 > 名称前缀 > 全拼前缀 > 首字母前缀 > 子串 > 模糊
+// - 删除/添加后立即可查，删除数超过扫描上限时不影响存活的菜品
+// - 重建期间的增量更新在重建完成后重放
+// - 收到 NOTIFY dish_search_index 后下一次检索时重建，监听连接断开后重连
+// - 后台重建失败时继续使用旧索引，不产生未处理的 Promise 拒绝
+
+const EventEmitter = require('events');
+
+// 可控的假 query：每次调用返回一个 Promise，由测试决定何时成功或失败；
+// getClient 返回记录 LISTEN 的假连接，测试通过 emit 模拟通知和断线
+const pendingQueries = [];
+const clients = [];
+const databasePath = require.resolve('./config/database');
+require.cache[databasePath] = {
+  id: databasePath,
+  filename: databasePath,
+  loaded: true,
+  exports: {
+    query: () => new Promise((resolve, reject) => pendingQueries.push({ resolve, reject })),
+    getClient: async () => {
+      const client = new EventEmitter();
+      client.queries = [];
+      client.released = false;
+      client.query = async (sql) => client.queries.push(sql);
+      client.release = () => { client.released = true; };
+      clients.push(client);
+      return client;
+    }
+  }
+};
+
+const { DishSearchIndex, searchDishes, addDish } = require('./utils/dishSearch');
+
+const PINYIN = {
+  牛: 'niu', 肉: 'rou', 面: 'mian', 套: 'tao', 餐: 'can', 红: 'hong', 烧: 'shao', 拉: 'la', 乳: 'ru', 茶: 'cha',
+  饼: 'bing', 素: 'su', 烩: 'hui', 饭: 'fan', 低: 'di', 盐: 'yan', 鸡: 'ji', 胸: 'xiong', 拌: 'ban', 自: 'zi',
+  助: 'zhu', 螺: 'luo', 蛳: 'si', 粉: 'fen', 招: 'zhao', 牌: 'pai', 原: 'yuan', 味: 'wei', 晋: 'jin', 运: 'yun',
+  大: 'da', 盘: 'pan', 刀: 'dao', 削: 'xiao', 新: 'xin', 菜: 'cai'
+};
+const fakePinyin = (name) => {
+  const syllables = Array.from(name.toLowerCase(), c => (/[a-z0-9]/.test(c) ? c : PINYIN[c] || ''));
+  return { full: syllables.join(''), initials: syllables.map(s => s.charAt(0)).join('') };
+};
+
+let failed = 0;
+const check = (ok, message) => {
+  console.log(`${ok ? '✅' : '❌'} ${message}`);
+  if (!ok) failed++;
+};
+const names = (results) => results.map(r => r.dish.name).join(',');
+const tick = () => new Promise(resolve => setImmediate(resolve));
+
+const DISHES = [
+  '牛肉面', '牛肉面套餐', '红烧牛肉面', '牛肉拉面', '牛乳茶', '烧饼', '素烩饭', '红烧肉',
+  'DIY', 'DIY拌饭', '低盐鸡胸', '自助低盐面', '招牌原味螺蛳粉', '晋运大盘鸡'
+].map((name, i) => ({ id: i + 1, name }));
+
+const testRanking = () => {
+  const index = new DishSearchIndex({ toPinyin: fakePinyin }).build(DISHES);
+
+  const byScore = (results) => results.every((r, i) => i === 0 || results[i - 1].score >= r.score);
+  let results = index.search('diy');
+  check(names(results) === 'DIY,DIY拌饭,低盐鸡胸,自助低盐面' && byScore(results),
+    `完全匹配 > 名称前缀 > 全拼前缀 > 子串：${names(results)}`);
+
+  results = index.search('sh');
+  check(names(results).startsWith('烧饼,素烩饭,') && names(results).includes('红烧') && byScore(results),
+    `全拼前缀 > 首字母前缀 > 子串：${names(results)}`);
+
+  results = index.search('牛肉面');
+  check(names(results) === '牛肉面,牛肉面套餐,红烧牛肉面,牛肉拉面' && byScore(results),
+    `完全匹配 > 名称前缀 > 子串 > 模糊：${names(results)}`);
+
+  results = index.search('niurou');
+  const scores = results.map(r => r.score);
+  check(names(results) === '牛肉面,牛肉拉面,牛肉面套餐,红烧牛肉面,牛乳茶' &&
+    scores[2] > scores[3] && scores[3] > scores[4] && byScore(results),
+  `全拼前缀 > 全拼子串 > 拼音模糊，同分时名称短的在前：${names(results)}`);
+
+  check(names(index.search('螺狮粉')) === '招牌原味螺蛳粉', '汉字错别字（螺狮粉）仍能模糊匹配');
+  check(names(index.search('dapan')) === '晋运大盘鸡', `拼音查询不会模糊匹配到无关菜品：${names(index.search('dapan'))}`);
+  check(index.search('牛肉面', { fuzzy: false }).every(r => r.score >= 40), 'fuzzy=false 不返回模糊结果');
+  check(index.search('牛', { limit: 2 }).length === 2, 'limit 限制返回条数');
+  check(index.search('  ').length === 0, '空查询返回空列表');
+};
+
+const testUpdates = () => {
+  const index = new DishSearchIndex({ toPinyin: fakePinyin }).build(DISHES);
+
+  index.remove(1);
+  check(!names(index.search('牛肉面')).split(',').includes('牛肉面') && index.size === DISHES.length - 1,
+    '删除后不再返回，子串、拼音、模糊匹配都跳过已删除的菜品');
+  check(!index.search('niurou').some(r => r.dish.id === 1), '删除后拼音检索也不返回');
+
+  index.add({ id: 1, name: '牛肉刀削面' });
+  check(index.search('牛肉刀')[0].dish.id === 1 && index.search('niuroudao')[0].dish.id === 1, '重新添加后名称和拼音都可查');
+
+  index.add({ id: 2, name: '新菜' });
+  check(index.search('新菜')[0].dish.id === 2 && !index.search('牛肉面套餐').some(r => r.dish.id === 2),
+    '同一 id 再次添加视为更新');
+  check(index.size === DISHES.length, `更新后菜品数不变（${index.size}）`);
+};
+
+// 真实的 pinyin-pro 输出必须符合 fakePinyin 的假设：小写、无声调、无空格，首字母逐字取
+const testDefaultPinyin = () => {
+  const { toPinyin } = new DishSearchIndex();
+  if (!toPinyin) {
+    console.log('⚠️  pinyin-pro 未安装，跳过默认拼音转换检查');
+    return;
+  }
+  const expected = {
+    牛肉面: ['niuroumian', 'nrm'],
+    招牌原味螺蛳粉: ['zhaopaiyuanweiluosifen', 'zpywlsf'],
+    重庆小面: ['chongqingxiaomian', 'cqxm'],
+    绿豆汤: ['lvdoutang', 'ldt'],
+    DIY拌饭: ['diybanfan', 'diybf']
+  };
+  for (const [name, [full, initials]] of Object.entries(expected)) {
+    const actual = toPinyin(name);
+    check(actual.full === full && actual.initials === initials,
+      `pinyin-pro: ${name} -> ${actual.full} / ${actual.initials}（期望 ${full} / ${initials}）`);
+  }
+  const index = new DishSearchIndex().build(DISHES);
+  check(names(index.search('lsf')) === '招牌原味螺蛳粉' && index.search('niurou')[0].dish.name === '牛肉面',
+    'pinyin-pro 构建的索引支持全拼和首字母检索');
+};
+
+// 已删除的槽位留在前缀表和倒排表中直到重建，数量超过扫描上限（前缀 200、子串 300、模糊候选 500）时
+// 不能挤掉存活的菜品
+const testTombstones = () => {
+  const many = Array.from({ length: 600 }, (_, i) => ({ id: i + 1, name: `牛肉${String(i).padStart(3, '0')}号` }));
+  const index = new DishSearchIndex({ toPinyin: fakePinyin }).build([...many, { id: 1000, name: '牛肉zz' }, { id: 1001, name: '红烧牛肉zz' }]);
+  for (const dish of many) index.remove(dish.id);
+
+  const results = index.search('牛肉');
+  check(names(results) === '牛肉zz,红烧牛肉zz' && results[0].score === 80 && results[1].score === 40,
+    `删除数超过扫描上限后仍按前缀、子串找到存活的菜品：${results.map(r => `${r.dish.name}(${r.score})`).join(',')}`);
+  check(names(index.search('niurou')) === '牛肉zz,红烧牛肉zz', '拼音前缀、子串同样跳过已删除的槽位');
+  check(names(index.search('nr')) === '牛肉zz,红烧牛肉zz', '首字母前缀、子串同样跳过已删除的槽位');
+
+  // 同一 id 反复更新，每次都留下一个失效槽位
+  for (let i = 0; i < 600; i++) index.add({ id: 1000, name: '牛肉zz' });
+  check(names(index.search('牛肉')) === '牛肉zz,红烧牛肉zz' && index.size === 2, '同一菜品更新次数超过扫描上限后仍可查');
+};
+
+const testRebuild = async () => {
+  const unhandled = [];
+  process.on('unhandledRejection', reason => unhandled.push(reason));
+  const rows = DISHES.slice(0, 4);
+
+  // 首次加载失败时把错误交给调用方，下一次请求重新加载
+  const first = searchDishes('牛肉面');
+  await tick();
+  pendingQueries.shift().reject(new Error('db down'));
+  let error = null;
+  try {
+    await first;
+  } catch (e) {
+    error = e;
+  }
+  check(error && error.message === 'db down', '首次加载失败时检索请求返回错误');
+
+  // 首次加载期间的增量更新在加载完成后重放
+  const second = searchDishes('牛肉面');
+  await tick();
+  addDish({ id: 100, name: '新菜' });
+  addDish({ id: 2, name: '改名菜' });
+  pendingQueries.shift().resolve({ rows });
+  await second;
+  let results = await searchDishes('新菜');
+  check(results.length === 1 && results[0].dish.id === 100, '加载期间添加的菜品在加载完成后仍可查');
+  results = await searchDishes('牛肉面套餐');
+  check(!results.some(r => r.dish.id === 2) && (await searchDishes('改名菜'))[0].dish.id === 2,
+    '加载期间更新的菜品在加载完成后使用新名称');
+
+  // 后台重建：重建期间继续使用旧索引，期间的更新重放到新索引上
+  const realNow = Date.now;
+  Date.now = () => realNow() + 11 * 60 * 1000;
+  results = await searchDishes('新菜');
+  check(results.length === 1 && pendingQueries.length === 1, '重建期间继续使用旧索引返回结果');
+  addDish({ id: 101, name: '红烧牛肉面套餐' });
+  pendingQueries.shift().resolve({ rows: DISHES });
+  await tick();
+  results = await searchDishes('红烧牛肉面');
+  check(results.some(r => r.dish.id === 101) && results.some(r => r.dish.id === 3), '重建完成后包含新数据和重建期间添加的菜品');
+  check(!(await searchDishes('新菜')).some(r => r.dish.id === 100), '重建后以数据库为准，未入库的菜品被丢弃');
+
+  // 后台重建失败：记录日志，继续使用旧索引，不能触发 unhandledRejection
+  Date.now = () => realNow() + 22 * 60 * 1000;
+  results = await searchDishes('红烧牛肉面');
+  pendingQueries.shift().reject(new Error('db down'));
+  await new Promise(resolve => setTimeout(resolve, 10));
+  check(results.length > 0 && (await searchDishes('红烧牛肉面')).length > 0, '后台重建失败时继续使用旧索引');
+  check(unhandled.length === 0, `后台重建失败不产生未处理的 Promise 拒绝（${unhandled.length}）`);
+  Date.now = realNow;
+};
+
+const testListener = async () => {
+  // 上一个测试中重建失败后，下一次检索已经重试了一次
+  for (const pending of pendingQueries.splice(0)) pending.resolve({ rows: DISHES });
+  await tick();
+  const client = clients[0];
+  check(clients.length === 1 && client.queries.includes('LISTEN dish_search_index'), '第一次检索时 LISTEN 变更通知频道');
+
+  // import_data.py 导入后发出通知：下一次检索触发后台重建
+  client.emit('notification', { channel: 'other' });
+  await searchDishes('红烧牛肉面');
+  check(pendingQueries.length === 0, '其他频道的通知不触发重建');
+  client.emit('notification', { channel: 'dish_search_index' });
+  let results = await searchDishes('晋运大盘鸡');
+  check(pendingQueries.length === 1 && results.length > 0, '收到通知后下一次检索在后台重建，期间使用旧索引');
+
+  // 重建查询期间又收到通知：新写入不一定在查询结果中，完成后再重建一次
+  client.emit('notification', { channel: 'dish_search_index' });
+  pendingQueries.shift().resolve({ rows: [...DISHES, { id: 200, name: '导入的新菜' }] });
+  await tick();
+  results = await searchDishes('导入的新菜');
+  check(results.length === 1 && results[0].dish.id === 200, '重建后可以查到导入的菜品');
+  check(pendingQueries.length === 1, '重建期间收到的通知在重建完成后再触发一次重建');
+  pendingQueries.shift().resolve({ rows: DISHES });
+  await tick();
+  await searchDishes('牛肉面');
+  check(pendingQueries.length === 0, '没有新通知时不再重建');
+
+  // 监听连接断开：下一次检索时重连，断开期间可能漏掉通知，所以重建一次
+  client.emit('error', new Error('connection terminated'));
+  check(client.released, '断开的监听连接归还连接池');
+  await searchDishes('牛肉面');
+  await tick();
+  check(clients.length === 2 && clients[1].queries.includes('LISTEN dish_search_index'), '下一次检索时重新 LISTEN');
+  check(pendingQueries.length === 1, '重连时重建一次，补上断开期间的变更');
+  pendingQueries.shift().resolve({ rows: DISHES });
+  await tick();
+};
+
+const main = async () => {
+  console.log('Testing dish search index...');
+  testRanking();
+  testDefaultPinyin();
+  testUpdates();
+  testTombstones();
+  await testRebuild();
+  await testListener();
+
+  if (failed) {
+    console.error(`Test FAILED: ${failed} check(s) failed.`);
+    process.exitCode = 1;
+  } else {
+    console.log('Test PASSED: dish search index.');
+  }
+};
+
+main();
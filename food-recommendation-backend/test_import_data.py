@@ -0,0 +1,171 @@
+"""
+识别结果导入测试
+
+用法：
+    python3 test_import_data.py
+    python3 -m pytest test_import_data.py
+
+不需要数据库：psycopg2 替换为记录 SQL、提交和回滚的假连接，检查 utils/import_data.py 的事务边界：
+- 默认整个导入是一个事务，按 chunk_size 分批写入但不提交，中途出错全部回滚
+- follow 模式（commit_each）每条餐厅记录写入后提交
+- 每次提交前通知菜品检索索引重建（pg_notify），回滚时不通知
+"""
+
+import io
+import os
+import sys
+import types
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, "utils"))
+
+# import_data 在模块顶层导入 psycopg2，测试环境不一定安装
+if "psycopg2" not in sys.modules:
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        sys.modules["psycopg2"] = types.ModuleType("psycopg2")
+        extras = types.ModuleType("psycopg2.extras")
+        extras.execute_values = None
+        sys.modules["psycopg2.extras"] = extras
+
+import import_data  # noqa: E402
+from record_stream import iter_json_stream, normalize_record  # noqa: E402
+
+failures = []
+
+
+def check(ok: bool, message: str):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+class FakeConnection:
+    """按顺序记录 SQL 语句、提交和回滚；已提交的菜品数用来判断中途出错后数据库里留下了什么"""
+
+    def __init__(self):
+        self.events = []
+        self.pending_dishes = 0
+        self.committed_dishes = 0
+        self.next_id = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.events.append("commit")
+        self.committed_dishes += self.pending_dishes
+        self.pending_dishes = 0
+
+    def rollback(self):
+        self.events.append("rollback")
+        self.pending_dishes = 0
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.events.append("notify" if "pg_notify" in sql else sql.split()[0].lower())
+        self.conn.next_id += 1
+
+    def fetchone(self):
+        return (self.conn.next_id,)
+
+    def close(self):
+        pass
+
+
+def fake_execute_values(cur, sql, values, page_size=100):
+    cur.conn.events.append(f"dishes:{len(values)}")
+    cur.conn.pending_dishes += len(values)
+
+
+import_data.execute_values = fake_execute_values
+
+
+def restaurants_from(text: str):
+    """像 iter_restaurants 一样流式读取，文件被截断时在读到末尾处抛出 ValueError"""
+    for record in iter_json_stream(io.StringIO(text), 16):
+        yield from normalize_record(record)
+
+
+def menu(name: str, dishes: int) -> str:
+    items = ", ".join(f'{{"名称": "{name}{i}", "价格": "{i + 1}元"}}' for i in range(dishes))
+    return f'{{"店名": "{name}", "菜品": [{items}]}}'
+
+
+def run(text: str, **kwargs):
+    conn = FakeConnection()
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    error = None
+    try:
+        import_data.import_restaurants(conn, restaurants_from(text), **kwargs)
+    except ValueError as e:
+        error = e
+    finally:
+        sys.stdout = stdout
+    return conn, error
+
+
+def check_single_transaction():
+    text = "[" + ", ".join(menu(f"店{i}", 4) for i in range(3)) + "]"
+    conn, error = run(text, chunk_size=3)
+    check(error is None and conn.committed_dishes == 12, f"完整文件：12 道菜全部写入（{conn.committed_dishes}）")
+    check(conn.events.count("commit") == 1 and conn.events[-1] == "commit",
+          f"默认只在最后提交一次：{conn.events}")
+    check(conn.events.count("dishes:3") == 4, "按 chunk_size 分批写入菜品")
+    check(conn.events[-2:] == ["notify", "commit"] and conn.events.count("notify") == 1, "提交前通知检索索引重建一次")
+
+    # 第三家餐厅写到一半文件结束
+    conn, error = run(text[:-40], chunk_size=3)
+    check(error is not None, f"截断的文件报错：{error}")
+    check(conn.committed_dishes == 0 and "commit" not in conn.events and conn.events[-1] == "rollback",
+          f"中途出错全部回滚，不留下已写入的批次：{conn.events}")
+    check("notify" not in conn.events, "回滚时不通知检索索引")
+
+    conn, error = run("[]")
+    check(conn.events == ["commit"], f"没有导入任何记录时不通知：{conn.events}")
+
+
+def check_commit_each():
+    text = "[" + ", ".join(menu(f"店{i}", 4) for i in range(3)) + "]"
+    conn, error = run(text, chunk_size=3, commit_each=True)
+    check(error is None and conn.events.count("commit") == 4, f"follow 模式每条餐厅记录提交一次：{conn.events}")
+    check(conn.events.count("notify") == 3 and all(
+        conn.events[i + 1] == "commit" for i, event in enumerate(conn.events) if event == "notify"),
+        "follow 模式每次提交前通知检索索引")
+
+    conn, error = run(text[:-40], chunk_size=3, commit_each=True)
+    check(error is not None and conn.committed_dishes == 8,
+          f"follow 模式出错时已完成的餐厅记录保留（{conn.committed_dishes} 道菜）")
+
+
+def run_checks() -> list:
+    """运行全部检查，返回失败项"""
+    failures.clear()
+    check_single_transaction()
+    check_commit_each()
+    return failures
+
+
+def test_import_data():
+    """pytest 入口"""
+    assert not run_checks(), failures
+
+
+def main():
+    print("开始测试识别结果导入...")
+    run_checks()
+
+    if failures:
+        print(f"导入测试失败！（{len(failures)} 项）")
+        sys.exit(1)
+    print("导入测试通过！")
+
+
+if __name__ == "__main__":
+    main()
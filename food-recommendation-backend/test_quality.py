@@ -0,0 +1,182 @@
+"""
+图片质量预检测试
+
+用法：
+    python3 test_quality.py
+    python3 -m pytest test_quality.py
+
+检查 utils/recognition/quality.py 的默认阈值：
+- data/ 和 uploads/ 中的真实菜单图片全部通过
+- 用 Pillow 从真实菜单生成的模糊、过暗、过曝图片，以及全黑、纯色、无文字图片分别因对应原因被拒绝，
+  光线偏暗但字迹清楚的菜单仍然通过
+- batch_request.save_results 统计的跳过请求数和节省 tokens
+"""
+
+import glob
+import io
+import os
+import sys
+import tempfile
+
+from PIL import Image, ImageDraw, ImageFilter
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, "utils"))
+
+from batch_request import estimate_request_tokens, save_results, skipped_result  # noqa: E402
+from recognition.quality import assess_image, filter_images  # noqa: E402
+
+MENU_IMAGES = sorted(glob.glob(os.path.join(ROOT_DIR, "data", "**", "*.png"), recursive=True)
+                     + glob.glob(os.path.join(ROOT_DIR, "uploads", "*.png")))
+SAMPLE_MENU = os.path.join(ROOT_DIR, "uploads", "1.png")
+
+# assess_image 返回的拒绝原因前缀
+BLURRY = "图片模糊"
+DARK = "图片过暗"
+BRIGHT = "图片过亮"
+CLIPPED = "曝光异常"
+NOT_MENU = "疑似非菜单图片"
+UNREADABLE = "无法读取图片"
+
+failures = []
+
+
+def check(ok: bool, message: str):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+def reason_kinds(report: dict) -> set:
+    return {reason.split(" (")[0].split(":")[0] for reason in report["reasons"]}
+
+
+def synthetic_images(folder: str) -> dict:
+    """生成测试图片，返回 {名称: (路径, 期望的拒绝原因集合)}，集合为空表示应当通过"""
+    with Image.open(SAMPLE_MENU) as img:
+        menu = img.convert("RGB")
+
+    blocks = Image.new("L", (1024, 768), 80)
+    draw = ImageDraw.Draw(blocks)
+    # 大色块：边缘清晰但没有密集的文字笔画，类似菜品照片、墙面
+    for x in range(0, 1024, 256):
+        for y in range(0, 768, 256):
+            if (x + y) // 256 % 2:
+                draw.rectangle([x, y, x + 255, y + 255], fill=170)
+
+    images = {
+        # 模糊到笔画消失，文字密度也随之降为 0
+        "高斯模糊的菜单": (menu.filter(ImageFilter.GaussianBlur(6)), {BLURRY, NOT_MENU}),
+        # 亮度缩小后笔画的梯度也变小：偏暗的仍能通过，过暗的被拒绝，但都不应被当成非菜单
+        "光线偏暗的菜单": (menu.point(lambda v: v // 4), set()),
+        "过暗的菜单": (menu.point(lambda v: v // 8), {BLURRY, DARK}),
+        "过曝的菜单": (menu.point(lambda v: min(255, v * 3)), {BRIGHT, CLIPPED}),
+        "全黑图片": (Image.new("RGB", menu.size, (0, 0, 0)), {BLURRY, DARK, CLIPPED, NOT_MENU}),
+        "纯色图片": (Image.new("RGB", menu.size, (200, 120, 60)), {BLURRY, NOT_MENU}),
+        "无文字的色块图片": (blocks, {NOT_MENU}),
+    }
+    paths = {}
+    for name, (image, expected) in images.items():
+        path = os.path.join(folder, f"{name}.png")
+        image.save(path)
+        paths[name] = (path, expected)
+    return paths
+
+
+def check_real_menus():
+    passed, rejected = filter_images(MENU_IMAGES)
+    check(len(MENU_IMAGES) > 0 and not rejected,
+          f"{len(passed)}/{len(MENU_IMAGES)} 张真实菜单图片通过预检"
+          + "".join(f"\n   ⛔ {os.path.basename(r['path'])}: {r['reasons']}" for r in rejected))
+
+
+def check_rejections(images: dict):
+    for name, (path, expected) in images.items():
+        report = assess_image(path)
+        kinds = reason_kinds(report)
+        verdict = f"被拒绝：{sorted(kinds)}" if expected else "通过"
+        check(report["passed"] == (not expected) and kinds == expected,
+              f"{name}{verdict}（期望 {sorted(expected)}，指标 {report['metrics']}）")
+
+    report = assess_image(os.path.join(ROOT_DIR, "test_quality.py"))
+    check(not report["passed"] and reason_kinds(report) == {UNREADABLE}, "不是图片的文件报告无法读取")
+
+    report = assess_image(SAMPLE_MENU, {"min_sharpness": 1e9})
+    check(reason_kinds(report) == {BLURRY}, "thresholds 参数覆盖默认阈值")
+
+    paths = [path for path, _ in images.values()]
+    passed, rejected = filter_images([SAMPLE_MENU] + paths, workers=2)
+    expected_passed = [SAMPLE_MENU] + [path for path, expected in images.values() if not expected]
+    check([r["path"] for r in passed] == expected_passed
+          and [r["path"] for r in rejected] == [path for path, expected in images.values() if expected],
+          "filter_images 按输入顺序分成通过和未通过两组")
+
+
+def quiet_save_results(results: list) -> tuple:
+    """在临时目录中调用 save_results，返回 (统计, 打印的内容)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            return save_results(results, tmp), sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+
+
+def check_summary(images: dict):
+    rejected = [assess_image(images[name][0]) for name in ("高斯模糊的菜单", "全黑图片")]
+    skipped = [skipped_result(report, compress=True, max_size=800) for report in rejected]
+    expected_saved = sum(estimate_request_tokens(r["width"], r["height"], True, 800) for r in rejected)
+    results = [
+        {"success": True, "image_path": "a.png", "usage": {"total_tokens": 1000}, "processing_time": 2.0,
+         "response": {"choices": [{"message": {"content": "{}"}}]}},
+        {"success": True, "image_path": "b.png", "usage": {"total_tokens": 3000}, "processing_time": 4.0,
+         "response": {"choices": [{"message": {"content": "{}"}}]}},
+        {"success": False, "image_path": "c.png", "error": "timeout"},
+        *skipped,
+    ]
+
+    summary, printed = quiet_save_results(results)
+
+    check(expected_saved > 0 and all(s["estimated_tokens_saved"] > 0 for s in skipped), "跳过的图片按尺寸估算节省的图片 tokens")
+    check((summary["total"], summary["successful"], summary["failed"], summary["skipped"]) == (5, 2, 1, 2),
+          f"总数/成功/失败/跳过：{summary['total']}/{summary['successful']}/{summary['failed']}/{summary['skipped']}")
+    check(summary["total_tokens"] == 4000 and summary["avg_time"] == 3.0, "成功请求的 token 和平均耗时")
+    check(summary["saved_image_tokens"] == expected_saved, f"节省图片 tokens（预估）: {summary['saved_image_tokens']}")
+    check(summary["projected_saved_tokens"] == 4000, "按本批平均消耗推算：2 个跳过请求 × 2000 = 4000")
+    check("节省请求数: 2" in printed and f"节省图片tokens(预估): {expected_saved}" in printed
+          and "推算节省tokens: 4000" in printed, "统计信息打印到控制台")
+
+    summary, _ = quiet_save_results(skipped)
+    check(summary["skipped"] == 2 and summary["failed"] == 0 and summary["projected_saved_tokens"] == 0,
+          "全部被跳过时没有平均消耗可推算，失败数不包含跳过的图片")
+
+
+def run_checks() -> list:
+    """运行全部检查，返回失败项"""
+    failures.clear()
+    with tempfile.TemporaryDirectory() as tmp:
+        images = synthetic_images(tmp)
+        check_real_menus()
+        check_rejections(images)
+        check_summary(images)
+    return failures
+
+
+def test_quality():
+    """pytest 入口"""
+    assert not run_checks(), failures
+
+
+def main():
+    print("开始测试图片质量预检...")
+    run_checks()
+
+    if failures:
+        print(f"质量预检测试失败！（{len(failures)} 项）")
+        sys.exit(1)
+    print("质量预检测试通过！")
+
+
+if __name__ == "__main__":
+    main()
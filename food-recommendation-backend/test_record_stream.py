@@ -0,0 +1,182 @@
+"""
+识别结果流式读取测试
+
+用法：
+    python3 test_record_stream.py
+    python3 -m pytest test_record_stream.py
+
+使用 results/ 和 batch_results_*.json 中的真实识别结果检查 utils/record_stream.py：
+- iter_json_stream 在极小的读取块（1、2、7 个字符）下与 json.load 结果一致
+- iter_jsonl 能处理写入方只写了半行的情况，并在结束标记处停止
+- 各种输入格式都能归一化为餐厅记录，没有菜品的记录被跳过
+"""
+
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, "utils"))
+
+from record_stream import (  # noqa: E402
+    JOURNAL_END_EVENT,
+    iter_json_stream,
+    iter_jsonl,
+    iter_restaurants,
+    normalize_record,
+)
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "results")
+BATCH_RESULTS = sorted(glob.glob(os.path.join(ROOT_DIR, "batch_results_*.json")))
+CHUNK_SIZES = (1, 2, 7)
+
+failures = []
+
+
+def check(ok: bool, message: str):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+class TrickleFile:
+    """模拟正在被追加写入的日志文件：每次 readline 只返回预先切好的一段"""
+
+    def __init__(self, pieces: list):
+        self.pieces = list(pieces)
+
+    def readline(self):
+        return self.pieces.pop(0) if self.pieces else ""
+
+
+def check_chunked_parsing():
+    files = BATCH_RESULTS + sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    # 顶层为数组、对象以及数组内含嵌套结构和转义字符的情况
+    inline = ['[1, -2.5e3, "a,]\\"b", {"k": [true, null]}, []]', '{"店名": "x", "菜品": []}', '  []  ', '12345']
+    for chunk_size in CHUNK_SIZES:
+        mismatched = []
+        for path in files:
+            with open(path, "r", encoding="utf-8") as f:
+                expected = json.load(f)
+            with open(path, "r", encoding="utf-8") as f:
+                actual = list(iter_json_stream(f, chunk_size))
+            if actual != (expected if isinstance(expected, list) else [expected]):
+                mismatched.append(os.path.basename(path))
+        for text in inline:
+            expected = json.loads(text)
+            actual = list(iter_json_stream(io.StringIO(text), chunk_size))
+            if actual != (expected if isinstance(expected, list) else [expected]):
+                mismatched.append(text)
+        check(not mismatched, f"chunk_size={chunk_size}: {len(files)} 个结果文件和 {len(inline)} 个内联样例解析一致"
+              + (f"，不一致: {mismatched}" if mismatched else ""))
+
+    try:
+        list(iter_json_stream(io.StringIO('[{"a": 1}, {"b"'), 2))
+        check(False, "截断的 JSON 数组应当报错")
+    except ValueError:
+        check(True, "截断的 JSON 数组报错")
+
+
+def check_jsonl():
+    lines = [json.dumps({"image": f"{i}.png", "content": "{}"}) + "\n" for i in range(3)]
+    # 第二行分三次写完，结束标记之后的内容不应再读取
+    pieces = [lines[0], lines[1][:5], "", lines[1][5:12], lines[1][12:], "\n", "", lines[2],
+              json.dumps({"event": JOURNAL_END_EVENT}) + "\n", lines[0]]
+    records = list(iter_jsonl(TrickleFile(pieces), follow=True, poll_interval=0))
+    check([r["image"] for r in records] == ["0.png", "1.png", "2.png"], "follow 模式拼接半行并在结束标记处停止")
+
+    records = list(iter_jsonl(TrickleFile([lines[0], lines[1][:-1]]), follow=True, poll_interval=0.01, idle_timeout=0.05))
+    check(len(records) == 1, "follow 模式空闲超时后退出，不解析未写完的行")
+
+    records = list(iter_jsonl(io.StringIO(lines[0] + "\n" + lines[1].rstrip("\n"))))
+    check(len(records) == 2, "非 follow 模式读取到文件末尾（最后一行没有换行符）")
+
+
+def check_record_shapes():
+    menu = {"店名": "测试店", "菜品": [{"名称": "牛肉面", "价格": "12元"}]}
+    content = "识别结果如下：\n```json\n" + json.dumps(menu, ensure_ascii=False) + "\n```"
+    response = {"choices": [{"message": {"content": content}}]}
+    shapes = {
+        "parsed_*.json": menu,
+        "result_*.json": response,
+        "extracted_content_*.json": [{"image": "a.png", "content": content}],
+        "batch_results_*.json": [{"success": True, "image_path": "data/a.png", "response": response}],
+        "旧版 res.json": [{"image": "a.png", "content": menu}],
+        "菜品及价格": {"店名": "测试店", "菜品及价格": [{"菜品名": "牛肉面", "价格": 12}]},
+        "菜品名价格（字典）": {"店名": "测试店", "菜品名价格": {"牛肉面": "12元"}},
+    }
+    for label, record in shapes.items():
+        restaurants = normalize_record(record)
+        ok = (len(restaurants) == 1 and restaurants[0]["name"] == "测试店"
+              and restaurants[0]["dishes"] == [{"name": "牛肉面", "price_text": restaurants[0]["dishes"][0]["price_text"]}]
+              and "12" in restaurants[0]["dishes"][0]["price_text"])
+        check(ok, f"{label} 归一化为一家餐厅一道菜")
+
+    check(normalize_record({"success": False, "response": None}) == [], "失败的批量结果被忽略")
+
+
+def check_fixture_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        # 把批量结果转换成日志格式，模拟 batch_journal_*.jsonl
+        journal = os.path.join(tmp, "batch_journal_test.jsonl")
+        with open(journal, "w", encoding="utf-8") as out:
+            for path in BATCH_RESULTS:
+                with open(path, "r", encoding="utf-8") as f:
+                    for record in iter_json_stream(f):
+                        if record.get("success"):
+                            content = record["response"]["choices"][0]["message"]["content"]
+                            out.write(json.dumps({"image": os.path.basename(record["image_path"]), "content": content},
+                                                 ensure_ascii=False) + "\n")
+            out.write(json.dumps({"event": JOURNAL_END_EVENT}) + "\n")
+
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            from_batch = list(iter_restaurants(BATCH_RESULTS))
+            from_journal = list(iter_restaurants([journal], follow=True, idle_timeout=0))
+            from_results = list(iter_restaurants(sorted(glob.glob(os.path.join(RESULTS_DIR, "*.*")))))
+            warnings = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+
+    check(bool(from_batch) and all(r["dishes"] for r in from_batch), f"batch_results: {len(from_batch)} 家餐厅均有菜品")
+    check(from_journal == from_batch, "batch_journal 与 batch_results 结果一致")
+    images = {r["image"] for r in from_batch}
+    check({"11.png", "17.png"} <= images, "菜品及价格 / 菜品价格 格式的菜单被导入")
+    check("15.png" not in images and "15.png" in warnings, "没有菜品的记录打印警告后跳过")
+    check(len(from_results) > 0 and all(r["dishes"] for r in from_results),
+          f"results/: parsed_/result_/content_ 共 {len(from_results)} 条记录")
+    check(all(not r["image"].startswith(("parsed_", "result_", "content_")) for r in from_results),
+          "单文件结果使用文件名中的图片名")
+
+
+def run_checks() -> list:
+    """运行全部检查，返回失败项"""
+    failures.clear()
+    check_chunked_parsing()
+    check_jsonl()
+    check_record_shapes()
+    check_fixture_files()
+    return failures
+
+
+def test_record_stream():
+    """pytest 入口"""
+    assert not run_checks(), failures
+
+
+def main():
+    print("开始测试识别结果流式读取...")
+    run_checks()
+
+    if failures:
+        print(f"流式读取测试失败！（{len(failures)} 项）")
+        sys.exit(1)
+    print("流式读取测试通过！")
+
+
+if __name__ == "__main__":
+    main()
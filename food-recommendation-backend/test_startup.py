@@ -0,0 +1,179 @@
+"""
+识别脚本冷启动时间测试
+
+用法：
+    python3 test_startup.py [--budget-ms 150] [--upload-budget-ms 400]
+
+Node 每次上传都会启动一次 utils/request.py，启动开销直接计入用户等待时间。
+本脚本检查两项：
+- 导入：在全新的子进程中导入 request.py / batch_request.py / analyze_tokens.py，
+  期间不能加载 openai、PIL、numpy 等重量级依赖，耗时不超过 --budget-ms
+- 上传：用一张真实菜单图片完整运行 python request.py <图片>（包括质量预检），
+  识别接口由本地测试服务代替（几乎不耗时），进程总耗时不超过 --upload-budget-ms，
+  且全程不导入 openai
+多次测量取最小值，减少磁盘缓存等噪声。
+也可以用 pytest 运行（test_startup），此时使用默认预算。
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+UTILS_DIR = os.path.join(ROOT_DIR, "utils")
+HEAVY_MODULES = ("openai", "PIL", "numpy", "httpx", "pydantic")
+SCRIPTS = ("request", "batch_request", "analyze_tokens")
+SAMPLE_IMAGE = os.path.join("uploads", "1.png")
+RUNS = 5
+BUDGET_MS = 150.0  # 导入耗时预算，可用 --budget-ms 覆盖
+UPLOAD_BUDGET_MS = 400.0  # 上传全流程耗时预算，可用 --upload-budget-ms 覆盖
+
+# 本地测试服务返回的识别结果
+STUB_CONTENT = '```json\n{"店名": "测试店", "菜品": [{"名称": "牛肉面", "价格": "12元"}]}\n```'
+STUB_RESPONSE = {
+    "id": "chatcmpl-startup-test",
+    "object": "chat.completion",
+    "model": "qwen3-vl-plus",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": STUB_CONTENT}}],
+    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+}
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {utils!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"elapsed_ms": elapsed * 1000, "heavy": heavy}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """在新进程中导入模块，返回 {"elapsed_ms", "heavy"}"""
+    code = PROBE.format(utils=UTILS_DIR, module=module, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True, text=True, check=True, cwd=UTILS_DIR
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """代替识别接口，记录收到的请求数"""
+
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        StubHandler.requests += 1
+        body = json.dumps(STUB_RESPONSE, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure_upload(base_url: str) -> dict:
+    """完整运行一次 request.py，返回 {"elapsed_ms", "heavy", "saved"}"""
+    env = dict(os.environ, DASHSCOPE_BASE_URL=base_url, DASHSCOPE_API_KEY="test")
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(UTILS_DIR, "request.py"), SAMPLE_IMAGE],
+        capture_output=True, text=True, cwd=ROOT_DIR, env=env
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+
+    # -X importtime 的输出格式: "import time: self | cumulative | 模块名"
+    loaded = {line.rsplit("|", 1)[-1].strip().split(".")[0]
+              for line in proc.stderr.splitlines() if line.startswith("import time:")}
+    saved = re.findall(r"已保存到: (.+)", proc.stdout)
+    # 测试产生的结果文件不保留
+    for path in saved:
+        os.remove(path.strip())
+    if proc.returncode != 0:
+        raise RuntimeError(f"request.py 退出码 {proc.returncode}: {proc.stderr[-500:]}")
+    return {"elapsed_ms": elapsed, "heavy": sorted(loaded & {"openai", "httpx", "pydantic"}), "saved": len(saved)}
+
+
+def check_imports(budget_ms: float) -> bool:
+    ok = True
+    for script in SCRIPTS:
+        samples = [measure(script) for _ in range(RUNS)]
+        best = min(s["elapsed_ms"] for s in samples)
+        heavy = samples[0]["heavy"]
+
+        script_ok = best <= budget_ms and not heavy
+        ok = ok and script_ok
+        print(f"{'✅' if script_ok else '❌'} {script}.py: 导入耗时 {best:.1f}ms")
+        if heavy:
+            print(f"   导入时加载了重量级依赖: {', '.join(heavy)}")
+    return ok
+
+
+def check_upload(budget_ms: float) -> bool:
+    server = HTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    try:
+        samples = [measure_upload(base_url) for _ in range(RUNS)]
+    finally:
+        server.shutdown()
+
+    best = min(s["elapsed_ms"] for s in samples)
+    heavy = samples[0]["heavy"]
+    ok = best <= budget_ms and not heavy and StubHandler.requests == RUNS and samples[0]["saved"] == 3
+    print(f"{'✅' if ok else '❌'} request.py {SAMPLE_IMAGE}: 上传全流程（含质量预检）耗时 {best:.1f}ms")
+    if heavy:
+        print(f"   上传时加载了重量级依赖: {', '.join(heavy)}")
+    if samples[0]["saved"] != 3:
+        print(f"   应保存 result_/content_/parsed_ 3 个文件，实际 {samples[0]['saved']} 个")
+    return ok
+
+
+def test_startup():
+    """pytest 入口，使用默认预算"""
+    imports_ok = check_imports(BUDGET_MS)
+    upload_ok = check_upload(UPLOAD_BUDGET_MS)
+    assert imports_ok and upload_ok, "冷启动测试失败，详见输出"
+
+
+def main():
+    budget_ms = BUDGET_MS
+    upload_budget_ms = UPLOAD_BUDGET_MS
+    try:
+        if "--budget-ms" in sys.argv:
+            idx = sys.argv.index("--budget-ms")
+            budget_ms = float(sys.argv[idx + 1])
+    except (IndexError, ValueError):
+        print("⚠️  budget-ms参数无效，使用默认值150")
+    try:
+        if "--upload-budget-ms" in sys.argv:
+            idx = sys.argv.index("--upload-budget-ms")
+            upload_budget_ms = float(sys.argv[idx + 1])
+    except (IndexError, ValueError):
+        print("⚠️  upload-budget-ms参数无效，使用默认值400")
+
+    print(f"开始测试识别脚本冷启动时间（预算 {budget_ms:.0f}ms）...")
+    imports_ok = check_imports(budget_ms)
+    print(f"开始测试上传全流程耗时（预算 {upload_budget_ms:.0f}ms）...")
+    upload_ok = check_upload(upload_budget_ms)
+
+    if not (imports_ok and upload_ok):
+        print("冷启动测试失败！")
+        sys.exit(1)
+    print("冷启动测试通过！")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ const fs = require('fs');
 const path = require('path');
 const { spawn } = require('child_process');
 const { query } = require('../config/database');
+const dishSearch = require('./dishSearch');
 
 // 调用真实的AI识别功能
 const recognizeMenu = async (imagePath, uploadId, restaurantId, windowNumber) => {
@@ -167,6 +168,7 @@ const saveRecognitionResults = async (recognitionResult, uploadId) => {
     await client.query('BEGIN');
 
     let restaurantId = recognitionResult.restaurant.id;
+    const savedDishes = []; // 提交后同步到菜品搜索索引
 
     // 如果没有提供餐厅ID，创建新餐厅
     if (!restaurantId) {
@@ -193,6 +195,19 @@ const saveRecognitionResults = async (recognitionResult, uploadId) => {
       }
     }
 
+    // 索引中的餐厅名称和窗口号以数据库中的记录为准：调用方传入已有餐厅的 id，
+    // 或按名称找到已有餐厅时，识别结果中的店名、窗口号可能不同甚至是“未知餐厅”
+    let storedRestaurant = { name: null, window_number: null };
+    if (restaurantId) {
+      const restaurantRow = await client.query(
+        'SELECT name, window_number FROM restaurants WHERE id = $1',
+        [restaurantId]
+      );
+      if (restaurantRow.rows.length > 0) {
+        storedRestaurant = restaurantRow.rows[0];
+      }
+    }
+
     // 插入菜品
     if (restaurantId && Array.isArray(recognitionResult.dishes)) {
       for (const dish of recognitionResult.dishes) {
@@ -205,16 +220,31 @@ const saveRecognitionResults = async (recognitionResult, uploadId) => {
             `UPDATE dishes
              SET price = $3,
                  updated_at = CURRENT_TIMESTAMP
-             WHERE restaurant_id = $1 AND name = $2`,
+             WHERE restaurant_id = $1 AND name = $2
+             RETURNING id`,
             [restaurantId, dishName, normalizedPrice]
           );
 
+          let dishRows = updateResult.rows;
           if (updateResult.rowCount === 0) {
-            await client.query(
+            const insertResult = await client.query(
               `INSERT INTO dishes (restaurant_id, name, price)
-               VALUES ($1, $2, $3)`,
+               VALUES ($1, $2, $3)
+               RETURNING id`,
               [restaurantId, dishName, normalizedPrice]
             );
+            dishRows = insertResult.rows;
+          }
+
+          for (const row of dishRows) {
+            savedDishes.push({
+              id: row.id,
+              name: dishName,
+              price: normalizedPrice,
+              restaurant_id: restaurantId,
+              restaurant_name: storedRestaurant.name,
+              window_number: storedRestaurant.window_number
+            });
           }
         } catch (error) {
           console.warn(`Failed to upsert dish ${dishName}:`, error.message);
@@ -224,6 +254,11 @@ const saveRecognitionResults = async (recognitionResult, uploadId) => {
 
     await client.query('COMMIT');
 
+    // 增量更新菜品搜索索引
+    for (const dish of savedDishes) {
+      dishSearch.addDish(dish);
+    }
+
   } catch (error) {
     console.error('Database operation failed:', error);
     // 不抛出错误，继续处理
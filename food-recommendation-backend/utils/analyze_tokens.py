@@ -14,30 +14,15 @@
 import os
 import sys
 from pathlib import Path
-from PIL import Image
 import json
 
-
-def estimate_tokens(width: int, height: int) -> int:
-    """估算Vision API的token消耗"""
-    # 调整到2048x2048以内
-    max_dim = max(width, height)
-    if max_dim > 2048:
-        scale = 2048 / max_dim
-        width = int(width * scale)
-        height = int(height * scale)
-    
-    # 计算需要多少个512x512的块
-    tiles_width = (width + 511) // 512
-    tiles_height = (height + 511) // 512
-    total_tiles = tiles_width * tiles_height
-    
-    # 每个tile大约170 tokens，加上固定85 tokens
-    return total_tiles * 170 + 85
+from recognition import estimate_tokens, scale_to_fit
 
 
 def analyze_image(image_path: str) -> dict:
     """分析单张图片"""
+    from PIL import Image
+
     try:
         with Image.open(image_path) as img:
             width, height = img.size
@@ -49,15 +34,7 @@ def analyze_image(image_path: str) -> dict:
             # 不同压缩设置下的token消耗
             compressed_scenarios = []
             for max_size in [512, 768, 1024, 1280]:
-                if max(width, height) > max_size:
-                    if width > height:
-                        new_width = max_size
-                        new_height = int(height * max_size / width)
-                    else:
-                        new_height = max_size
-                        new_width = int(width * max_size / height)
-                else:
-                    new_width, new_height = width, height
+                new_width, new_height = scale_to_fit(width, height, max_size)
                 
                 compressed_tokens = estimate_tokens(new_width, new_height)
                 compression_ratio = compressed_tokens / original_tokens if original_tokens > 0 else 1
@@ -1,26 +1,36 @@
 import os
 import sys
-import base64
-import mimetypes
 import json
 import time
 from datetime import datetime
 from pathlib import Path
-from PIL import Image
-import io
-from openai import OpenAI
+
+from recognition import (
+    create_client,
+    estimate_tokens,
+    get_image_size_info,
+    image_file_to_data_uri,
+    scale_to_fit,
+)
+from record_stream import JOURNAL_END_EVENT
 
 """
 批量图片识别脚本 - 优化版本
 
 用法：
     python batch_request.py /path/to/folder [--compress] [--max-size 1024] [--delay 1]
+                            [--quality skip|flag|off] [--min-sharpness 60]
 
 参数：
     folder_path: 包含图片的文件夹路径
     --compress: 是否压缩图片以减少token消耗
     --max-size: 压缩后的最大尺寸（默认1024px）
     --delay: 请求间隔秒数（默认1秒，避免频率限制）
+    --quality: 本地质量预检模式（默认skip）
+               skip - 跳过模糊/过暗/非菜单图片，不发送请求
+               flag - 只在结果中标记，仍然发送请求
+               off  - 关闭预检
+    --min-sharpness: 清晰度阈值（拉普拉斯方差，默认60）
 
 优化特性：
 - 图片压缩减少token消耗
@@ -28,102 +38,16 @@ from openai import OpenAI
 - 错误重试机制
 - 进度跟踪
 - 自动跳过已处理的图片
+- 本地质量预检，避免为无效图片支付请求费用
+- 逐条写入 batch_journal_*.jsonl，可配合 import_data.py --follow 边识别边导入
 """
 
 
-def compress_image(image_path: str, max_size: int = 1024, quality: int = 85) -> bytes:
-    """
-    压缩图片以减少token消耗
-    
-    Args:
-        image_path: 图片路径
-        max_size: 最大尺寸（宽或高）
-        quality: JPEG质量（1-100）
-    
-    Returns:
-        压缩后的图片字节数据
-    """
-    with Image.open(image_path) as img:
-        # 转换为RGB（如果是RGBA）
-        if img.mode in ('RGBA', 'LA', 'P'):
-            img = img.convert('RGB')
-        
-        # 计算新尺寸
-        width, height = img.size
-        if max(width, height) > max_size:
-            if width > height:
-                new_width = max_size
-                new_height = int(height * max_size / width)
-            else:
-                new_height = max_size
-                new_width = int(width * max_size / height)
-            
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # 保存为字节流
-        buffer = io.BytesIO()
-        img.save(buffer, format='JPEG', quality=quality, optimize=True)
-        return buffer.getvalue()
-
-
-def image_file_to_data_uri(path: str, compress: bool = True, max_size: int = 1024) -> str:
-    """
-    将图片转换为data URI，可选压缩
-    """
-    if not os.path.isfile(path):
-        raise FileNotFoundError(f"文件未找到: {path}")
-    
+def estimate_request_tokens(width: int, height: int, compress: bool, max_size: int) -> int:
+    """估算实际发送的图片（压缩后）的token消耗"""
     if compress:
-        # 使用压缩后的图片数据
-        image_data = compress_image(path, max_size)
-        mime_type = "image/jpeg"
-    else:
-        # 使用原始图片数据
-        with open(path, "rb") as f:
-            image_data = f.read()
-        mime_type, _ = mimetypes.guess_type(path)
-        if mime_type is None:
-            mime_type = "application/octet-stream"
-    
-    b64 = base64.b64encode(image_data).decode("ascii")
-    return f"data:{mime_type};base64,{b64}"
-
-
-def get_image_size_info(path: str) -> dict:
-    """获取图片尺寸信息"""
-    try:
-        with Image.open(path) as img:
-            width, height = img.size
-            file_size = os.path.getsize(path)
-            return {
-                "width": width,
-                "height": height,
-                "file_size": file_size,
-                "format": img.format
-            }
-    except Exception:
-        return {"error": "无法读取图片信息"}
-
-
-def estimate_tokens(width: int, height: int) -> int:
-    """
-    估算Vision API的token消耗
-    基于OpenAI的计算方式：图片先resize到fit 2048x2048，然后按512x512块计算
-    """
-    # 调整到2048x2048以内
-    max_dim = max(width, height)
-    if max_dim > 2048:
-        scale = 2048 / max_dim
-        width = int(width * scale)
-        height = int(height * scale)
-    
-    # 计算需要多少个512x512的块
-    tiles_width = (width + 511) // 512
-    tiles_height = (height + 511) // 512
-    total_tiles = tiles_width * tiles_height
-    
-    # 每个tile大约170 tokens，加上固定85 tokens
-    return total_tiles * 170 + 85
+        width, height = scale_to_fit(width, height, max_size)
+    return estimate_tokens(width, height)
 
 
 def process_single_image(client, image_path: str, compress: bool = True, max_size: int = 1024) -> dict:
@@ -186,8 +110,80 @@ def process_single_image(client, image_path: str, compress: bool = True, max_siz
         }
 
 
-def save_results(results: list, output_dir: str = "results"):
-    """保存批量处理结果"""
+def skipped_result(report: dict, compress: bool = True, max_size: int = 1024) -> dict:
+    """为未通过质量预检而跳过的图片构造结果记录"""
+    saved_tokens = 0
+    if 'width' in report and 'height' in report:
+        saved_tokens = estimate_request_tokens(report['width'], report['height'], compress, max_size)
+    return {
+        "success": False,
+        "skipped": True,
+        "image_path": report['path'],
+        "error": "; ".join(report['reasons']),
+        "quality": report,
+        "estimated_tokens_saved": saved_tokens
+    }
+
+
+def extract_content_entry(result: dict) -> dict:
+    """从单条成功结果中提取识别内容"""
+    response_data = result['response']
+    content = response_data.get('choices', [{}])[0].get('message', {}).get('content', '')
+    return {
+        "image": os.path.basename(result['image_path']),
+        "content": content,
+        "usage": result.get('usage', {})
+    }
+
+
+def open_journal(output_dir: str = "results"):
+    """创建本次批量识别的日志文件，每处理完一张图片追加一行"""
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    journal_file = os.path.join(output_dir, f"batch_journal_{timestamp}.jsonl")
+    print(f"📝 识别日志: {journal_file}")
+    return open(journal_file, 'w', encoding='utf-8')
+
+
+def append_journal(journal, record: dict):
+    """追加一行日志并立即刷新，保证导入脚本能读到完整的行"""
+    journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+    journal.flush()
+
+
+def summarize_results(results: list) -> dict:
+    """
+    统计批量处理结果
+
+    Returns:
+        {"total", "successful", "failed", "skipped", "total_tokens", "avg_time",
+         "saved_image_tokens", "projected_saved_tokens"}
+        saved_image_tokens 是跳过的图片按尺寸估算的图片 token，
+        projected_saved_tokens 按本批成功请求的平均 token 消耗推算（没有成功请求时为 0）
+    """
+    success_results = [r for r in results if r['success']]
+    skipped_results = [r for r in results if r.get('skipped')]
+    successful = len(success_results)
+    skipped = len(skipped_results)
+
+    total_tokens = sum(r.get('usage', {}).get('total_tokens', 0) for r in success_results)
+    avg_time = sum(r.get('processing_time', 0) for r in success_results) / successful if successful else 0.0
+    avg_tokens = total_tokens / successful if successful else 0.0
+
+    return {
+        "total": len(results),
+        "successful": successful,
+        "failed": len(results) - successful - skipped,
+        "skipped": skipped,
+        "total_tokens": total_tokens,
+        "avg_time": avg_time,
+        "saved_image_tokens": sum(r.get('estimated_tokens_saved', 0) for r in skipped_results),
+        "projected_saved_tokens": avg_tokens * skipped,
+    }
+
+
+def save_results(results: list, output_dir: str = "results") -> dict:
+    """保存批量处理结果，打印并返回 summarize_results 的统计"""
     os.makedirs(output_dir, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
@@ -205,13 +201,7 @@ def save_results(results: list, output_dir: str = "results"):
         
         for result in success_results:
             try:
-                response_data = result['response']
-                content = response_data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                extracted_content.append({
-                    "image": os.path.basename(result['image_path']),
-                    "content": content,
-                    "usage": result.get('usage', {})
-                })
+                extracted_content.append(extract_content_entry(result))
             except Exception as e:
                 print(f"⚠️  提取内容时出错: {e}")
         
@@ -219,21 +209,24 @@ def save_results(results: list, output_dir: str = "results"):
             json.dump(extracted_content, f, ensure_ascii=False, indent=2)
         print(f"📄 识别内容已保存到: {content_file}")
     
-    # 打印统计信息
-    total_images = len(results)
-    successful = len(success_results)
-    failed = total_images - successful
-    
+    summary = summarize_results(results)
     print(f"\n📊 处理统计:")
-    print(f"   总图片数: {total_images}")
-    print(f"   成功: {successful}")
-    print(f"   失败: {failed}")
-    
-    if success_results:
-        total_tokens = sum(r.get('usage', {}).get('total_tokens', 0) for r in success_results)
-        avg_time = sum(r.get('processing_time', 0) for r in success_results) / len(success_results)
-        print(f"   总token消耗: {total_tokens}")
-        print(f"   平均处理时间: {avg_time:.2f}秒")
+    print(f"   总图片数: {summary['total']}")
+    print(f"   成功: {summary['successful']}")
+    print(f"   失败: {summary['failed']}")
+    print(f"   质量预检跳过: {summary['skipped']}")
+
+    if summary['successful']:
+        print(f"   总token消耗: {summary['total_tokens']}")
+        print(f"   平均处理时间: {summary['avg_time']:.2f}秒")
+
+    if summary['skipped']:
+        print(f"   节省请求数: {summary['skipped']}")
+        print(f"   节省图片tokens(预估): {summary['saved_image_tokens']}")
+        if summary['projected_saved_tokens']:
+            print(f"   按本批平均消耗推算节省tokens: {summary['projected_saved_tokens']:.0f}")
+
+    return summary
 
 
 def main():
@@ -263,15 +256,28 @@ def main():
     except (IndexError, ValueError):
         print("⚠️  delay参数无效，使用默认值1秒")
     
+    quality_mode = "skip"
+    if "--quality" in sys.argv:
+        idx = sys.argv.index("--quality")
+        if idx + 1 < len(sys.argv) and sys.argv[idx + 1] in ("skip", "flag", "off"):
+            quality_mode = sys.argv[idx + 1]
+        else:
+            print("⚠️  quality参数无效，使用默认值skip")
+    
+    thresholds = {}
+    try:
+        if "--min-sharpness" in sys.argv:
+            idx = sys.argv.index("--min-sharpness")
+            thresholds["min_sharpness"] = float(sys.argv[idx + 1])
+    except (IndexError, ValueError):
+        print("⚠️  min-sharpness参数无效，使用默认值")
+    
     if not os.path.isdir(folder_path):
         print(f"❌ 文件夹不存在: {folder_path}")
         sys.exit(1)
     
     # 准备客户端
-    client = OpenAI(
-        api_key=os.getenv("DASHSCOPE_API_KEY"),
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-    )
+    client = create_client()
     
     # 查找图片文件
     image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
@@ -286,19 +292,45 @@ def main():
         sys.exit(1)
     
     print(f"🎯 找到 {len(image_files)} 张图片")
-    print(f"⚙️  配置: 压缩={'是' if compress else '否'}, 最大尺寸={max_size}px, 延迟={delay}秒")
+    print(f"⚙️  配置: 压缩={'是' if compress else '否'}, 最大尺寸={max_size}px, 延迟={delay}秒, 质量预检={quality_mode}")
     print("=" * 50)
     
-    # 批量处理
+    # 本地质量预检（在任何网络请求之前并行完成）
     results = []
-    for i, image_path in enumerate(image_files, 1):
-        print(f"\n[{i}/{len(image_files)}]", end=" ")
-        result = process_single_image(client, image_path, compress, max_size)
-        results.append(result)
+    quality_reports = {}
+    if quality_mode != "off":
+        from recognition.quality import filter_images
         
-        # 延迟（除了最后一个）
-        if i < len(image_files):
-            time.sleep(delay)
+        start_time = time.time()
+        passed, rejected = filter_images(image_files, thresholds)
+        print(f"🔎 质量预检完成，耗时: {time.time() - start_time:.2f}秒，"
+              f"通过 {len(passed)} 张，未通过 {len(rejected)} 张")
+        for report in rejected:
+            print(f"   ⛔ {os.path.basename(report['path'])}: {'; '.join(report['reasons'])}")
+        quality_reports = {r['path']: r for r in passed + rejected}
+        if quality_mode == "skip":
+            results = [skipped_result(r, compress, max_size) for r in rejected]
+            image_files = [r['path'] for r in passed]
+    
+    # 批量处理
+    journal = open_journal()
+    try:
+        for i, image_path in enumerate(image_files, 1):
+            print(f"\n[{i}/{len(image_files)}]", end=" ")
+            result = process_single_image(client, image_path, compress, max_size)
+            if image_path in quality_reports:
+                result["quality"] = quality_reports[image_path]
+            results.append(result)
+            if result['success']:
+                append_journal(journal, extract_content_entry(result))
+            
+            # 延迟（除了最后一个）
+            if i < len(image_files):
+                time.sleep(delay)
+    finally:
+        # 中断或出错时也写入结束标记，避免 import_data.py --follow 一直等待
+        append_journal(journal, {"event": JOURNAL_END_EVENT})
+        journal.close()
     
     print("\n" + "=" * 50)
     print("🎉 批量处理完成！")
@@ -0,0 +1,323 @@
+const fs = require('fs');
+const path = require('path');
+const { query } = require('../config/database');
+
+// 食堂步行距离索引
+//
+// 站点描述见 config/campus_map.json：入口、楼梯/电梯和各楼层窗口的坐标。
+// 模块加载时预先计算好所有窗口两两之间的步行距离矩阵和每个窗口的近邻顺序，
+// 查询"离某处最近的 K 道菜"时只需按距离顺序扫描窗口，不再访问数据库。
+// 配置文件修改后自动重新加载，无需重启服务。
+
+const SITE_FILE = process.env.CAMPUS_MAP_FILE || path.join(__dirname, '..', 'config', 'campus_map.json');
+const DEFAULT_FLOOR_COST = 20; // 未配置 cost_per_floor 时每层折合的步行米数
+const DISH_CACHE_TTL = 60 * 1000; // 菜品数据缓存时间（毫秒）
+
+const windowKey = (campus, canteen, floor, windowNumber) =>
+  `${campus}|${canteen}|${Number(floor)}|${String(windowNumber).trim()}`;
+const floorKey = (campus, canteen, floor) => `${campus}|${canteen}|${Number(floor)}`;
+const distance = (a, b) => Math.hypot(a.x - b.x, a.y - b.y);
+
+// 根据站点描述构建距离索引
+const buildSite = (description) => {
+  const hubs = []; // 入口以及楼梯/电梯在每层的落点
+  const windows = [];
+  const hubsByFloor = new Map(); // floorKey -> 该层的 hub 下标
+  const windowsByFloor = new Map(); // floorKey -> 该层的窗口下标
+  const entrancesByCampus = new Map();
+  const outdoorFactor = new Map();
+
+  const addToGroup = (map, key, value) => {
+    if (!map.has(key)) map.set(key, []);
+    map.get(key).push(value);
+  };
+
+  for (const [campus, campusInfo] of Object.entries(description.campuses || {})) {
+    outdoorFactor.set(campus, campusInfo.outdoor_factor || 1);
+
+    for (const [canteen, info] of Object.entries(campusInfo.canteens || {})) {
+      const floors = Object.keys(info.windows || {}).map(Number);
+
+      for (const entrance of info.entrances || []) {
+        const floor = entrance.floor || 1;
+        const idx = hubs.push({ campus, canteen, floor, x: entrance.x, y: entrance.y, entrance: true }) - 1;
+        addToGroup(hubsByFloor, floorKey(campus, canteen, floor), idx);
+        addToGroup(entrancesByCampus, campus, idx);
+        floors.push(floor);
+      }
+
+      const minFloor = Math.min(...floors);
+      const maxFloor = Math.max(...floors);
+      for (const connector of info.vertical || []) {
+        const cost = connector.cost_per_floor ?? DEFAULT_FLOOR_COST;
+        let below = -1;
+        for (let floor = minFloor; floor <= maxFloor; floor++) {
+          const idx = hubs.push({ campus, canteen, floor, x: connector.x, y: connector.y, below, cost }) - 1;
+          addToGroup(hubsByFloor, floorKey(campus, canteen, floor), idx);
+          below = idx;
+        }
+      }
+
+      for (const [floor, floorWindows] of Object.entries(info.windows || {})) {
+        for (const [windowNumber, [x, y]] of Object.entries(floorWindows)) {
+          const idx = windows.push({
+            key: windowKey(campus, canteen, floor, windowNumber),
+            campus,
+            canteen,
+            floor: Number(floor),
+            window_number: windowNumber,
+            x,
+            y
+          }) - 1;
+          addToGroup(windowsByFloor, floorKey(campus, canteen, floor), idx);
+        }
+      }
+    }
+  }
+
+  // hub 之间的最短路（Floyd-Warshall），hub 数量只有几十个
+  const H = hubs.length;
+  const hubDist = new Float64Array(H * H).fill(Infinity);
+  for (let i = 0; i < H; i++) hubDist[i * H + i] = 0;
+
+  const link = (i, j, cost) => {
+    if (cost < hubDist[i * H + j]) {
+      hubDist[i * H + j] = cost;
+      hubDist[j * H + i] = cost;
+    }
+  };
+  for (const group of hubsByFloor.values()) {
+    for (const i of group) {
+      for (const j of group) {
+        if (i < j) link(i, j, distance(hubs[i], hubs[j]));
+      }
+    }
+  }
+  hubs.forEach((hub, i) => {
+    if (hub.below >= 0) link(i, hub.below, hub.cost);
+  });
+  for (const [campus, entrances] of entrancesByCampus) {
+    for (const i of entrances) {
+      for (const j of entrances) {
+        if (i < j && hubs[i].canteen !== hubs[j].canteen) {
+          link(i, j, distance(hubs[i], hubs[j]) * outdoorFactor.get(campus));
+        }
+      }
+    }
+  }
+  for (let k = 0; k < H; k++) {
+    for (let i = 0; i < H; i++) {
+      const ik = hubDist[i * H + k];
+      if (ik === Infinity) continue;
+      for (let j = 0; j < H; j++) {
+        const through = ik + hubDist[k * H + j];
+        if (through < hubDist[i * H + j]) hubDist[i * H + j] = through;
+      }
+    }
+  }
+
+  const site = {
+    hubs,
+    hubDist,
+    windows,
+    hubsByFloor,
+    windowsByFloor,
+    entrancesByCampus,
+    outdoorFactor,
+    windowIndex: new Map(windows.map((w, i) => [w.key, i])),
+    matrix: null,
+    order: null
+  };
+
+  // 窗口两两之间的距离矩阵，以及每个窗口按距离排序的近邻顺序
+  const W = windows.length;
+  site.matrix = new Float32Array(W * W);
+  site.order = new Array(W);
+  for (let i = 0; i < W; i++) {
+    const row = distancesFrom(site, windows[i]);
+    site.matrix.set(row, i * W);
+    site.order[i] = sortByDistance(row);
+  }
+
+  return site;
+};
+
+// 任意位置到所有 hub 的步行距离
+const hubDistancesFrom = (site, point) => {
+  const H = site.hubs.length;
+  const result = new Float64Array(H).fill(Infinity);
+  let starts;
+  let factor = 1;
+
+  if (point.canteen) {
+    starts = site.hubsByFloor.get(floorKey(point.campus, point.canteen, point.floor || 1)) || [];
+  } else {
+    // 不在食堂内，先走到本校区的某个入口
+    starts = site.entrancesByCampus.get(point.campus) || [];
+    factor = site.outdoorFactor.get(point.campus) || 1;
+  }
+
+  for (const s of starts) {
+    const toStart = distance(point, site.hubs[s]) * factor;
+    for (let h = 0; h < H; h++) {
+      const d = toStart + site.hubDist[s * H + h];
+      if (d < result[h]) result[h] = d;
+    }
+  }
+  return result;
+};
+
+// 任意位置到所有窗口的步行距离
+const distancesFrom = (site, point) => {
+  const toHub = hubDistancesFrom(site, point);
+  const result = new Float32Array(site.windows.length);
+  const sameFloor = point.canteen ? floorKey(point.campus, point.canteen, point.floor || 1) : null;
+
+  site.windows.forEach((w, i) => {
+    const key = floorKey(w.campus, w.canteen, w.floor);
+    let best = key === sameFloor ? distance(point, w) : Infinity;
+    for (const h of site.hubsByFloor.get(key) || []) {
+      const d = toHub[h] + distance(site.hubs[h], w);
+      if (d < best) best = d;
+    }
+    result[i] = best;
+  });
+  return result;
+};
+
+const sortByDistance = (row) => {
+  const order = new Uint32Array(row.length);
+  for (let i = 0; i < order.length; i++) order[i] = i;
+  return order.sort((a, b) => row[a] - row[b]);
+};
+
+const readSite = () => {
+  try {
+    return buildSite(JSON.parse(fs.readFileSync(SITE_FILE, 'utf-8')));
+  } catch (error) {
+    console.warn('Failed to load campus map:', error.message);
+    return buildSite({});
+  }
+};
+
+let site = readSite();
+let dishRows = [];
+let dishesByWindow = [];
+let dishesLoadedAt = 0;
+let refreshing = null; // 正在进行的刷新，缓存过期时并发到达的请求共用同一次查询
+
+// 把菜品挂到对应窗口上，无法定位的菜品（缺少食堂/楼层/窗口号）会被忽略
+const attachDishes = () => {
+  dishesByWindow = site.windows.map(() => []);
+  for (const row of dishRows) {
+    const idx = site.windowIndex.get(windowKey(row.campus, row.store_name, row.floor, row.window_number));
+    if (idx !== undefined) dishesByWindow[idx].push(row);
+  }
+};
+
+// 重新读取站点描述并重建距离索引
+const reload = () => {
+  site = readSite();
+  attachDishes();
+  console.log(`Campus map loaded: ${site.windows.length} windows`);
+  return site;
+};
+
+fs.watchFile(SITE_FILE, { persistent: false, interval: 2000 }, (curr, prev) => {
+  if (curr.mtimeMs !== prev.mtimeMs) reload();
+});
+
+const setDishes = (rows) => {
+  dishRows = rows;
+  dishesLoadedAt = Date.now();
+  attachDishes();
+};
+
+// 从数据库刷新菜品及其所在窗口
+const refreshDishes = async () => {
+  const result = await query(`
+    SELECT
+      d.id AS dish_id,
+      d.name AS dish_name,
+      d.price,
+      d.image_url AS dish_image,
+      r.id AS restaurant_id,
+      r.name AS restaurant_name,
+      r.campus,
+      r.store_name,
+      r.floor,
+      r.window_number
+    FROM dishes d
+    JOIN restaurants r ON d.restaurant_id = r.id
+    WHERE r.window_number IS NOT NULL AND r.store_name IS NOT NULL
+  `);
+  setDishes(result.rows);
+};
+
+const ensureDishes = async () => {
+  if (!refreshing && Date.now() - dishesLoadedAt > DISH_CACHE_TTL) {
+    refreshing = refreshDishes().finally(() => {
+      refreshing = null;
+    });
+  }
+  if (refreshing) await refreshing;
+};
+
+const hasCampus = (campus) => site.outdoorFactor.has(campus);
+
+const hasWindow = (campus, canteen, floor, windowNumber) =>
+  site.windowIndex.has(windowKey(campus, canteen, floor, windowNumber));
+
+// 两个窗口之间的步行距离，窗口不存在时返回 null
+const windowDistance = (a, b) => {
+  const i = site.windowIndex.get(windowKey(a.campus, a.canteen, a.floor, a.window_number));
+  const j = site.windowIndex.get(windowKey(b.campus, b.canteen, b.floor, b.window_number));
+  if (i === undefined || j === undefined) return null;
+  return site.matrix[i * site.windows.length + j];
+};
+
+// 离某个位置最近的 K 道满足条件的菜品
+//
+// point 可以是某个窗口 { campus, canteen, floor, window_number }，直接使用预计算的近邻顺序；
+// 也可以是任意坐标 { campus, canteen?, floor?, x, y }，不带 canteen 表示在室外。
+const nearestDishes = (point, { k = 10, filter = null } = {}) => {
+  let row;
+  let order;
+  const idx = point.window_number !== undefined
+    ? site.windowIndex.get(windowKey(point.campus, point.canteen, point.floor, point.window_number))
+    : undefined;
+
+  if (idx !== undefined) {
+    const W = site.windows.length;
+    row = site.matrix.subarray(idx * W, (idx + 1) * W);
+    order = site.order[idx];
+  } else {
+    row = distancesFrom(site, point);
+    order = sortByDistance(row);
+  }
+
+  const results = [];
+  for (const w of order) {
+    if (row[w] === Infinity) break;
+    for (const dish of dishesByWindow[w]) {
+      if (filter && !filter(dish)) continue;
+      results.push({ dish, window: site.windows[w], distance: row[w] });
+      if (results.length >= k) return results;
+    }
+  }
+  return results;
+};
+
+module.exports = {
+  windowKey,
+  buildSite,
+  reload,
+  setDishes,
+  refreshDishes,
+  ensureDishes,
+  hasCampus,
+  hasWindow,
+  windowDistance,
+  nearestDishes,
+  getSite: () => site
+};
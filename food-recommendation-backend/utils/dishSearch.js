@@ -0,0 +1,536 @@
+const { query, getClient } = require('../config/database');
+
+// 菜品名称内存检索索引
+//
+// dishes.name 上没有文本索引，LIKE '%…%' 只能全表扫描。这里在内存中维护：
+// - 名称、全拼、拼音首字母三张有序表，二分查找做前缀补全
+// - 汉字单字/双字、拼音双字母/三字母的倒排表（Uint32Array），求交集做子串匹配
+// - 汉字双字/隔字双字、拼音三字母的共享数量做模糊匹配（错别字、漏字）
+// 识别结果入库时通过 addDish 增量更新。import_data.py 批量导入、后台管理修改或删除菜品后
+// 通过 PostgreSQL 的 NOTIFY dish_search_index 通知（见 migrations/dish_search_notify.sql），
+// 收到通知后下一次检索时在后台全量重建；另外定期全量重建兜底。
+
+// 拼音转换依赖 pinyin-pro（见 package.json），依赖缺失时退化为只支持汉字检索，不影响服务启动
+let pinyinPro = null;
+try {
+  pinyinPro = require('pinyin-pro');
+} catch (error) {
+  console.warn('pinyin-pro is not installed, pinyin dish search is disabled');
+}
+
+const REBUILD_INTERVAL = 10 * 60 * 1000; // 全量重建间隔（毫秒）
+const CHANGE_CHANNEL = 'dish_search_index'; // 菜品变更通知频道，与 import_data.py、迁移脚本一致
+const LISTEN_RETRY_INTERVAL = 60 * 1000; // 监听连接失败后的重试间隔（毫秒）
+const PREFIX_SCAN_LIMIT = 200; // 每张前缀表最多取出的条数
+const SUBSTRING_SCAN_LIMIT = 300; // 子串匹配最多校验的候选数
+const FUZZY_MIN_OVERLAP = 0.3; // 模糊匹配要求与查询共享的 n-gram 比例
+const FUZZY_CANDIDATE_LIMIT = 500; // 模糊匹配最多打分的候选数
+
+const SCORE_EXACT = 100;
+const SCORE_NAME_PREFIX = 80;
+const SCORE_PINYIN_PREFIX = 70;
+const SCORE_INITIALS_PREFIX = 60;
+const SCORE_SUBSTRING = 40;
+const SCORE_FUZZY = 30;
+
+const normalize = (text) => String(text || '').toLowerCase().replace(/\s+/g, '');
+const isPinyinQuery = (text) => /^[a-z]+$/.test(text);
+
+// 输出与查询同一套写法：小写、无声调、无空格，ü 写作 v（绿 -> lv），否则 ü 会被下面的过滤去掉
+const PINYIN_OPTIONS = { toneType: 'none', type: 'array', v: true };
+const defaultToPinyin = pinyinPro
+  ? (name) => ({
+    full: pinyinPro.pinyin(name, PINYIN_OPTIONS).join('').toLowerCase().replace(/[^a-z0-9]/g, ''),
+    initials: pinyinPro.pinyin(name, { ...PINYIN_OPTIONS, pattern: 'first' }).join('').toLowerCase().replace(/[^a-z0-9]/g, '')
+  })
+  : null;
+
+// [lo, hi) 内第一个 >= value 的下标
+const lowerBound = (array, value, lo = 0, hi = array.length) => {
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (array[mid] < value) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+};
+
+// 汉字取单字和双字，拼音取双字母
+const nameGrams = (text) => {
+  const chars = Array.from(text);
+  const grams = new Set();
+  for (let i = 0; i < chars.length; i++) {
+    grams.add(chars[i]);
+    if (i + 1 < chars.length) grams.add(chars[i] + chars[i + 1]);
+  }
+  return grams;
+};
+
+// 子串查询只需要双字（单字查询除外），双字的倒排表短得多
+const nameQueryGrams = (text) => {
+  const chars = Array.from(text);
+  if (chars.length === 1) return new Set(chars);
+  const grams = new Set();
+  for (let i = 0; i + 1 < chars.length; i++) grams.add(chars[i] + chars[i + 1]);
+  return grams;
+};
+
+const pinyinGrams = (text, n = 2) => {
+  const grams = new Set();
+  for (let i = 0; i + n <= text.length; i++) grams.add(text.slice(i, i + n));
+  return grams;
+};
+
+// 模糊匹配用的汉字 n-gram：双字加隔一个字的双字。
+// 不用单字，常见字（粉、鸡、面）的倒排表太长；隔字双字让中间错一个字的查询
+// （螺狮粉 -> 螺蛳粉）仍能共享 "螺_粉"
+const fuzzyNameGrams = (text) => {
+  const chars = Array.from(text);
+  const grams = [];
+  for (let i = 0; i + 1 < chars.length; i++) grams.push('n:' + chars[i] + chars[i + 1]);
+  for (let i = 0; i + 2 < chars.length; i++) grams.push('s:' + chars[i] + chars[i + 2]);
+  return new Set(grams);
+};
+
+// 模糊匹配用的拼音 n-gram：三字母，双字母太常见（"an"、"ao"），会匹配到大量无关菜品
+const fuzzyPinyinGrams = (text) => Array.from(pinyinGrams(text, 3), gram => 't:' + gram);
+
+// 从 lo 开始找第一个 >= value 的下标：倍增步长跳跃后在最后一段内二分，
+// 指针只需单向前进的有序合并中，相邻目标接近时退化为线性扫描，相差悬殊时接近二分查找
+const gallop = (array, value, lo, length) => {
+  let step = 1;
+  while (lo + step < length && array[lo + step] < value) {
+    lo += step;
+    step *= 2;
+  }
+  return lowerBound(array, value, lo, Math.min(lo + step + 1, length));
+};
+
+// 倒排表：按文档槽位升序存放的 Uint32Array
+class PostingList {
+  constructor() {
+    this.ids = new Uint32Array(4);
+    this.length = 0;
+  }
+
+  // 槽位单调递增，直接追加即可保持有序
+  add(id) {
+    if (this.length === this.ids.length) {
+      const grown = new Uint32Array(this.length * 2);
+      grown.set(this.ids);
+      this.ids = grown;
+    }
+    this.ids[this.length++] = id;
+  }
+
+  view() {
+    return this.ids.subarray(0, this.length);
+  }
+}
+
+// 按槽位存放的数值列。模糊匹配要对成千上万个候选打分排序，
+// 从紧凑的 Uint16Array 读取比逐个访问分散在堆上的文档对象快得多
+class SlotColumn {
+  constructor() {
+    this.values = new Uint16Array(1024);
+  }
+
+  set(slot, value) {
+    if (slot >= this.values.length) {
+      const grown = new Uint16Array(Math.max(this.values.length * 2, slot + 1));
+      grown.set(this.values);
+      this.values = grown;
+    }
+    this.values[slot] = Math.min(value, 0xffff);
+  }
+}
+
+// 有序 (key, slot) 表，用于前缀查找
+class PrefixTable {
+  constructor() {
+    this.keys = [];
+    this.slots = [];
+  }
+
+  insert(key, slot) {
+    const i = lowerBound(this.keys, key);
+    this.keys.splice(i, 0, key);
+    this.slots.splice(i, 0, slot);
+  }
+
+  // 批量构建时先追加，最后统一排序
+  push(key, slot) {
+    this.keys.push(key);
+    this.slots.push(slot);
+  }
+
+  sort() {
+    const order = this.keys.map((_, i) => i).sort((a, b) =>
+      (this.keys[a] < this.keys[b] ? -1 : this.keys[a] > this.keys[b] ? 1 : this.slots[a] - this.slots[b]));
+    this.keys = order.map(i => this.keys[i]);
+    this.slots = order.map(i => this.slots[i]);
+  }
+
+  // 以 prefix 开头的条目，最多 limit 条；lengths[slot] 为 0 的已删除槽位跳过，不计入 limit
+  *range(prefix, limit, lengths) {
+    let count = 0;
+    for (let i = lowerBound(this.keys, prefix); i < this.keys.length && count < limit; i++) {
+      if (!this.keys[i].startsWith(prefix)) return;
+      if (lengths[this.slots[i]] === 0) continue;
+      count++;
+      yield [this.keys[i], this.slots[i]];
+    }
+  }
+}
+
+class DishSearchIndex {
+  constructor({ toPinyin = defaultToPinyin } = {}) {
+    this.toPinyin = toPinyin;
+    this.docs = []; // 槽位 -> 文档，删除后置为 null，槽位不复用
+    this.slotById = new Map();
+    this.postings = new Map(); // 'n:' 汉字 / 'p:' 全拼 / 'i:' 首字母 n-gram -> PostingList
+    this.names = new PrefixTable();
+    this.fullPinyin = new PrefixTable();
+    this.initials = new PrefixTable();
+    this.bulk = false;
+    this.marks = new Uint8Array(0); // 模糊匹配收集候选时的去重标记，按需扩容后复用
+    this.nameLengths = new SlotColumn(); // 名称长度，已删除的槽位为 0
+    this.nameGramCounts = new SlotColumn(); // 汉字模糊匹配 n-gram 数
+    this.fullGramCounts = new SlotColumn(); // 全拼模糊匹配 n-gram 数
+  }
+
+  get size() {
+    return this.slotById.size;
+  }
+
+  // 批量导入，前缀表最后统一排序
+  build(dishes) {
+    this.bulk = true;
+    try {
+      for (const dish of dishes) this.add(dish);
+    } finally {
+      this.bulk = false;
+      this.names.sort();
+      this.fullPinyin.sort();
+      this.initials.sort();
+    }
+    return this;
+  }
+
+  // 添加或更新一道菜：dish 至少包含 id 和 name，其余字段原样返回给调用方
+  add(dish) {
+    if (this.slotById.has(dish.id)) this.remove(dish.id);
+
+    const name = normalize(dish.name);
+    if (!name) return;
+    const pinyin = this.toPinyin ? this.toPinyin(dish.name) : { full: '', initials: '' };
+    const fuzzyName = fuzzyNameGrams(name);
+    const fuzzyPinyin = fuzzyPinyinGrams(pinyin.full);
+    const slot = this.docs.length;
+
+    this.docs.push({ id: dish.id, name, full: pinyin.full, initials: pinyin.initials, data: dish });
+    this.slotById.set(dish.id, slot);
+    this.nameLengths.set(slot, name.length);
+    this.nameGramCounts.set(slot, fuzzyName.size);
+    this.fullGramCounts.set(slot, fuzzyPinyin.length);
+
+    for (const gram of nameGrams(name)) this.posting('n:' + gram).add(slot);
+    for (const term of fuzzyName) {
+      if (term.startsWith('s:')) this.posting(term).add(slot);
+    }
+    for (const gram of pinyinGrams(pinyin.full)) this.posting('p:' + gram).add(slot);
+    for (const term of fuzzyPinyin) this.posting(term).add(slot);
+    for (const gram of pinyinGrams(pinyin.initials)) this.posting('i:' + gram).add(slot);
+
+    const insert = this.bulk ? 'push' : 'insert';
+    this.names[insert](name, slot);
+    if (pinyin.full) this.fullPinyin[insert](pinyin.full, slot);
+    if (pinyin.initials) this.initials[insert](pinyin.initials, slot);
+  }
+
+  // 倒排表和前缀表中的槽位不删除，只把文档置为 null，查询时跳过；
+  // 从长数组中间删除需要搬移整段数据，失效槽位等定期全量重建时清理
+  remove(id) {
+    const slot = this.slotById.get(id);
+    if (slot === undefined) return;
+
+    this.docs[slot] = null;
+    this.nameLengths.set(slot, 0);
+    this.slotById.delete(id);
+  }
+
+  posting(term) {
+    let list = this.postings.get(term);
+    if (!list) {
+      list = new PostingList();
+      this.postings.set(term, list);
+    }
+    return list;
+  }
+
+  // 各倒排表求交集，最多返回 limit 个存活的槽位
+  //
+  // 以最短的表为基准逐个检查其余各表；表都有序，各表的指针只需单向前进。
+  // 某张表排除了候选后把它换到最前面先检查：每个 n-gram 都常见、但很少同时出现时
+  // （如 "luosifeng"），大部分候选只需查一张表就能排除。
+  intersect(terms, limit) {
+    const lists = [];
+    for (const term of terms) {
+      const list = this.postings.get(term);
+      if (!list || list.length === 0) return [];
+      lists.push(list);
+    }
+    lists.sort((a, b) => a.length - b.length);
+
+    const base = lists[0].view();
+    const lengths = this.nameLengths.values;
+    const cursors = new Array(lists.length).fill(0);
+    const result = [];
+    for (let i = 0; i < base.length && result.length < limit; i++) {
+      const slot = base[i];
+      if (lengths[slot] === 0) continue;
+      let found = true;
+      for (let k = 1; k < lists.length; k++) {
+        const { ids, length } = lists[k];
+        const j = gallop(ids, slot, cursors[k], length);
+        cursors[k] = j;
+        if (j >= length) return result;
+        if (ids[j] !== slot) {
+          found = false;
+          if (k > 1) {
+            [lists[1], lists[k]] = [lists[k], lists[1]];
+            [cursors[1], cursors[k]] = [cursors[k], cursors[1]];
+          }
+          break;
+        }
+      }
+      if (found) result.push(slot);
+    }
+    return result;
+  }
+
+  // 按查询与文档共享的 n-gram 数量打分（Dice 系数），返回得分最高的 limit 条
+  //
+  // terms 是查询的倒排表键，gramCounts 是各文档对应的 n-gram 总数，
+  // minShared 是至少要共享的 n-gram 数
+  fuzzyMatches(terms, gramCounts, minShared, limit) {
+    const needed = Math.max(Math.ceil(terms.length * FUZZY_MIN_OVERLAP), Math.min(minShared, terms.length));
+    const lists = terms.map(term => this.postings.get(term)).filter(list => list && list.length > 0);
+    if (lists.length < needed) return [];
+    lists.sort((a, b) => a.length - b.length);
+
+    // 共享 needed 个 n-gram 的文档一定出现在最短的 (表数 - needed + 1) 张倒排表之一中，
+    // 只从这几张表收集候选；常见 n-gram 的表很长，候选数封顶，避免逐个扫描
+    if (this.marks.length < this.docs.length) this.marks = new Uint8Array(this.docs.length * 2);
+    const marks = this.marks;
+    const lengths = this.nameLengths.values;
+    const candidates = [];
+    const seeds = lists.length - needed + 1;
+    collect:
+    for (let k = 0; k < seeds; k++) {
+      const ids = lists[k].view();
+      for (let i = 0; i < ids.length; i++) {
+        if (marks[ids[i]] === 1 || lengths[ids[i]] === 0) continue;
+        marks[ids[i]] = 1;
+        candidates.push(ids[i]);
+        if (candidates.length >= FUZZY_CANDIDATE_LIMIT) break collect;
+      }
+    }
+    for (let i = 0; i < candidates.length; i++) marks[candidates[i]] = 0;
+
+    // 候选排序后与每张表做有序合并，统计共享的 n-gram 数
+    const sorted = Uint32Array.from(candidates).sort();
+    const shared = new Uint16Array(sorted.length);
+    for (const { ids, length } of lists) {
+      let j = 0;
+      for (let c = 0; c < sorted.length; c++) {
+        j = gallop(ids, sorted[c], j, length);
+        if (j >= length) break;
+        if (ids[j] === sorted[c]) shared[c]++;
+      }
+    }
+
+    const docGrams = gramCounts.values;
+    const ranked = [];
+    for (let c = 0; c < sorted.length; c++) {
+      const slot = sorted[c];
+      if (shared[c] < needed) continue;
+      this.rank(ranked, slot, SCORE_FUZZY * (2 * shared[c]) / (terms.length + docGrams[slot]), limit);
+    }
+    return ranked;
+  }
+
+  // (slot, score) 是否排在 entry 之前：分数高的在前，同分时名称越短越靠前
+  outranks(slot, score, entry) {
+    if (score !== entry[1]) return score > entry[1];
+    const lengths = this.nameLengths.values;
+    const length = lengths[slot];
+    const other = lengths[entry[0]];
+    return length < other || (length === other && slot < entry[0]);
+  }
+
+  // 把 (slot, score) 插入按排名排列、最多 limit 条的 ranked 中
+  rank(ranked, slot, score, limit) {
+    if (ranked.length === limit && !this.outranks(slot, score, ranked[limit - 1])) return;
+    let i = ranked.length;
+    while (i > 0 && this.outranks(slot, score, ranked[i - 1])) i--;
+    ranked.splice(i, 0, [slot, score]);
+    if (ranked.length > limit) ranked.pop();
+  }
+
+  /**
+   * 检索菜品
+   *
+   * 依次尝试：名称完全匹配/前缀 > 全拼前缀 > 首字母前缀 > 子串 > 模糊匹配，
+   * 前面的结果已经够 limit 条时不再执行后面代价更高的匹配。
+   * 同分时名称越短越靠前。
+   *
+   * @returns {Array<{dish: object, score: number}>}
+   */
+  search(text, { limit = 10, fuzzy = true } = {}) {
+    const q = normalize(text);
+    if (!q) return [];
+
+    const scores = new Map();
+    const lengths = this.nameLengths.values;
+    const consider = (slot, score) => {
+      if (lengths[slot] !== 0 && !(scores.get(slot) >= score)) scores.set(slot, score);
+    };
+    const pinyinQuery = this.toPinyin !== null && isPinyinQuery(q);
+
+    // 前缀匹配
+    for (const [key, slot] of this.names.range(q, PREFIX_SCAN_LIMIT, lengths)) {
+      consider(slot, key === q ? SCORE_EXACT : SCORE_NAME_PREFIX);
+    }
+    if (pinyinQuery) {
+      for (const [, slot] of this.fullPinyin.range(q, PREFIX_SCAN_LIMIT, lengths)) consider(slot, SCORE_PINYIN_PREFIX);
+      for (const [, slot] of this.initials.range(q, PREFIX_SCAN_LIMIT, lengths)) consider(slot, SCORE_INITIALS_PREFIX);
+    }
+
+    // 子串匹配：n-gram 倒排表求交集后逐个校验
+    if (scores.size < limit) {
+      const fields = [['n:', 'name', nameQueryGrams(q)]];
+      if (pinyinQuery && q.length >= 2) {
+        // 全拼的双字母太常见，三个字母以上的查询改用三字母倒排表，候选少得多
+        fields.push(q.length >= 3 ? ['t:', 'full', pinyinGrams(q, 3)] : ['p:', 'full', pinyinGrams(q)]);
+        fields.push(['i:', 'initials', pinyinGrams(q)]);
+      }
+      for (const [prefix, field, grams] of fields) {
+        for (const slot of this.intersect(Array.from(grams, gram => prefix + gram), SUBSTRING_SCAN_LIMIT)) {
+          const doc = this.docs[slot];
+          if (doc && doc[field].includes(q)) consider(slot, SCORE_SUBSTRING);
+        }
+      }
+    }
+
+    // 模糊匹配
+    if (fuzzy && scores.size < limit) {
+      // 汉字共享一个双字就有意义；拼音至少要共享两个三字母，所以只对 4 个字母以上的查询做模糊匹配
+      const matches = this.fuzzyMatches(Array.from(fuzzyNameGrams(q)), this.nameGramCounts, 1, limit);
+      if (pinyinQuery && q.length >= 4) {
+        matches.push(...this.fuzzyMatches(fuzzyPinyinGrams(q), this.fullGramCounts, 2, limit));
+      }
+      for (const [slot, score] of matches) consider(slot, score);
+    }
+
+    const ranked = [];
+    for (const [slot, score] of scores) this.rank(ranked, slot, score, limit);
+    return ranked.map(([slot, score]) => ({ dish: this.docs[slot].data, score: Math.round(score * 100) / 100 }));
+  }
+}
+
+// 全局索引：第一次检索时从数据库加载，之后收到变更通知或定期在后台重建
+let index = new DishSearchIndex();
+let loadedAt = 0;
+let loading = null;
+let pendingChanges = null; // 重建期间通过 addDish 加入的菜品，重建完成后重放
+let stale = false; // 收到变更通知后置位，下一次检索时重建
+let listening = null;
+let listenRetryAt = 0;
+
+// 占用连接池中的一条连接 LISTEN 变更通知。连接断开后等下一次检索时重连，
+// 断开期间可能漏掉通知，所以重连后重建一次
+const listenForChanges = async () => {
+  const client = await getClient();
+  client.on('notification', (message) => {
+    if (message.channel === CHANGE_CHANNEL) stale = true;
+  });
+  client.on('error', (error) => {
+    console.error('Dish search change listener failed:', error.message);
+    client.release(error);
+    listening = null;
+    stale = true;
+  });
+  try {
+    await client.query(`LISTEN ${CHANGE_CHANNEL}`);
+  } catch (error) {
+    client.release(error);
+    throw error;
+  }
+  if (listenRetryAt) stale = true;
+};
+
+const loadIndex = async () => {
+  pendingChanges = [];
+  // 查询开始后才提交的写入不一定在结果中，期间收到的通知留给下一次重建
+  const wasStale = stale;
+  stale = false;
+  try {
+    const result = await query(`
+      SELECT d.id, d.name, d.price, d.restaurant_id,
+             r.name AS restaurant_name, r.window_number
+      FROM dishes d
+      JOIN restaurants r ON d.restaurant_id = r.id
+    `);
+    const rebuilt = new DishSearchIndex().build(result.rows);
+    for (const dish of pendingChanges) rebuilt.add(dish);
+    index = rebuilt;
+    loadedAt = Date.now();
+    console.log(`Dish search index built: ${index.size} dishes`);
+  } catch (error) {
+    stale = stale || wasStale;
+    throw error;
+  } finally {
+    pendingChanges = null;
+    loading = null;
+  }
+};
+
+const ensureIndex = async () => {
+  if (!listening && Date.now() >= listenRetryAt) {
+    // 监听失败不影响检索，只是外部写入要等定期重建才可见
+    listening = listenForChanges();
+    listening.catch((error) => {
+      console.error('Dish search change listener failed:', error.message);
+      listening = null;
+      listenRetryAt = Date.now() + LISTEN_RETRY_INTERVAL;
+    });
+  }
+  if (!loading && (stale || Date.now() - loadedAt > REBUILD_INTERVAL)) {
+    loading = loadIndex();
+    if (loadedAt) {
+      // 后台重建没有调用方等待，失败时只记录日志并继续使用旧索引，
+      // 否则未处理的 rejection 会触发 app.js 的 gracefulShutdown
+      loading.catch(error => console.error('Dish search index rebuild failed:', error.message));
+    }
+  }
+  // 首次加载需要等待（失败时把错误交给调用方），之后重建期间继续使用旧索引
+  if (!loadedAt && loading) await loading;
+};
+
+const addDish = (dish) => {
+  index.add(dish);
+  if (pendingChanges) pendingChanges.push(dish);
+};
+
+const searchDishes = async (text, options) => {
+  await ensureIndex();
+  return index.search(text, options);
+};
+
+module.exports = {
+  DishSearchIndex,
+  searchDishes,
+  addDish,
+  ensureIndex
+};
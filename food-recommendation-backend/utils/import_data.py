@@ -1,8 +1,36 @@
-import json
-import psycopg2
+"""
+识别结果导入数据库
+
+用法：
+    python import_data.py [path ...] [--follow] [--idle-timeout 60] [--chunk-size 500]
+
+参数：
+    path: 识别结果文件或目录，默认为 res.json
+          目录会展开为其中的 parsed_*.json 和 extracted_content_*.json
+          支持的格式见 record_stream.py
+    --follow: 持续读取 batch_journal_*.jsonl，批量识别仍在运行时即可开始导入
+    --idle-timeout: follow 模式下无新数据多少秒后退出（默认300）
+    --chunk-size: 每批写入的菜品条数（默认500）
+
+默认整个导入在一个事务中完成，中途出错（文件被截断、数据库错误）时全部回滚，
+修复后重新导入不会产生重复的餐厅和菜品。
+follow 模式下每条餐厅记录写入后立即提交，边识别边导入时新数据马上可见。
+每次提交时通知 Node 服务重建菜品检索索引（NOTIFY dish_search_index）。
+
+记录逐条流式读取、分批写入，内存占用与输入文件大小无关。
+"""
+
 import re
+import sys
+
+import psycopg2
 from psycopg2.extras import execute_values
 
+from record_stream import iter_restaurants
+
+# Node 服务的菜品检索索引在这个频道上监听，导入提交后重建（见 utils/dishSearch.js）
+SEARCH_INDEX_CHANNEL = "dish_search_index"
+
 # 数据库连接配置
 DB_CONFIG = {
     "dbname": "restaurant_db",
@@ -69,64 +97,145 @@ def parse_price_advanced(price_text):
     
     return min_price, max_price, original_text
 
-# 读取JSON文件
-with open('res.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
-
-# 连接到数据库
-conn = psycopg2.connect(**DB_CONFIG)
-cur = conn.cursor()
 
-# 处理每个餐厅数据
-for restaurant_data in data:
-    # 提取餐厅信息
-    restaurant_name = restaurant_data["content"]["店名"]
-    
-    # 插入餐厅数据
-    cur.execute(
-        "INSERT INTO restaurants (name) VALUES (%s) RETURNING id",
-        (restaurant_name,)
-    )
-    restaurant_id = cur.fetchone()[0]
-    
-    # 处理菜品数据
-    dishes = restaurant_data["content"]["菜品"]
-    dish_values = []
-    
-    for dish in dishes:
-        dish_name = dish["名称"]
-        price_text = dish["价格"]
-        image_url = restaurant_data.get("image", "")
-        
-        # 解析价格
-        min_price, max_price, original_price = parse_price_advanced(price_text)
-        
-        # 如果无法解析价格，使用默认值
-        if min_price is None:
-            min_price = 0
-            max_price = 0
-        
-        dish_values.append((
-            restaurant_id,
-            dish_name,
-            min_price,  # 使用最小价格作为主要价格
-            original_price,  # 存储原始价格文本
-            min_price,  # 最小价格
-            max_price,  # 最大价格
-            image_url
-        ))
-    
-    # 批量插入菜品数据
+def flush_dishes(cur, dish_values: list):
+    """批量插入一批菜品（不提交，由调用方决定事务边界）"""
+    if not dish_values:
+        return
     execute_values(
         cur,
         "INSERT INTO dishes (restaurant_id, name, price, original_price_text, min_price, max_price, image_url) VALUES %s",
-        dish_values
+        dish_values,
+        page_size=len(dish_values)
     )
+    dish_values.clear()
+
+
+def notify_search_index(cur):
+    """通知 Node 服务重建菜品检索索引，通知随事务提交送达，回滚时不发出"""
+    cur.execute("SELECT pg_notify(%s, '')", (SEARCH_INDEX_CHANNEL,))
+
+
+def import_restaurants(conn, restaurants, chunk_size: int = 500, commit_each: bool = False) -> dict:
+    """
+    把归一化后的餐厅记录写入数据库
+
+    Args:
+        conn: 数据库连接
+        restaurants: 可迭代的餐厅记录（见 record_stream.normalize_record）
+        chunk_size: 每批写入的菜品条数，只控制内存占用，不单独提交
+        commit_each: 每条餐厅记录写入后立即提交（follow 模式使用，避免长时间占用事务）；
+            默认整个导入是一个事务，出错时全部回滚
+
+    Returns:
+        导入统计 {"restaurants": 餐厅数, "dishes": 菜品数}
+    """
+    cur = conn.cursor()
+    dish_values = []
+    stats = {"restaurants": 0, "dishes": 0}
+
+    try:
+        for restaurant in restaurants:
+            # 插入餐厅数据
+            cur.execute(
+                "INSERT INTO restaurants (name) VALUES (%s) RETURNING id",
+                (restaurant["name"],)
+            )
+            restaurant_id = cur.fetchone()[0]
+            stats["restaurants"] += 1
+
+            # 处理菜品数据
+            for dish in restaurant["dishes"]:
+                # 解析价格
+                min_price, max_price, original_price = parse_price_advanced(dish["price_text"])
+
+                # 如果无法解析价格，使用默认值
+                if min_price is None:
+                    min_price = 0
+                    max_price = 0
+
+                dish_values.append((
+                    restaurant_id,
+                    dish["name"],
+                    min_price,  # 使用最小价格作为主要价格
+                    original_price,  # 存储原始价格文本
+                    min_price,  # 最小价格
+                    max_price,  # 最大价格
+                    restaurant["image"]
+                ))
+                stats["dishes"] += 1
+
+                if len(dish_values) >= chunk_size:
+                    flush_dishes(cur, dish_values)
+
+            if commit_each:
+                flush_dishes(cur, dish_values)
+                notify_search_index(cur)
+                conn.commit()
+
+            print(f"✅ {restaurant['name']}: {len(restaurant['dishes'])} 道菜")
+
+        # 提交剩余数据
+        flush_dishes(cur, dish_values)
+        if stats["restaurants"] and not commit_each:
+            notify_search_index(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return stats
+
+
+def main():
+    args = sys.argv[1:]
+    follow = "--follow" in args
+    chunk_size = 500
+    idle_timeout = 300.0
+
+    try:
+        if "--chunk-size" in args:
+            idx = args.index("--chunk-size")
+            chunk_size = max(1, int(args[idx + 1]))
+    except (IndexError, ValueError):
+        print("⚠️  chunk-size参数无效，使用默认值500")
+
+    try:
+        if "--idle-timeout" in args:
+            idx = args.index("--idle-timeout")
+            idle_timeout = float(args[idx + 1])
+    except (IndexError, ValueError):
+        print("⚠️  idle-timeout参数无效，使用默认值300")
+
+    # 去掉选项及其取值，剩下的是输入路径
+    paths = []
+    skip_next = False
+    for arg in args:
+        if skip_next:
+            skip_next = False
+        elif arg in ("--chunk-size", "--idle-timeout"):
+            skip_next = True
+        elif not arg.startswith("--"):
+            paths.append(arg)
+    if not paths:
+        paths = ["res.json"]
+
+    # 连接到数据库
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        stats = import_restaurants(
+            conn,
+            iter_restaurants(paths, follow=follow, idle_timeout=idle_timeout),
+            chunk_size,
+            commit_each=follow
+        )
+    finally:
+        conn.close()
 
-# 提交事务并关闭连接
-conn.commit()
-cur.close()
-conn.close()
+    print(f"数据导入完成！餐厅: {stats['restaurants']}，菜品: {stats['dishes']}")
 
-print("数据导入完成！")
 
+if __name__ == "__main__":
+    main()
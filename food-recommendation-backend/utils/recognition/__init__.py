@@ -0,0 +1,35 @@
+"""
+菜单识别公共库
+
+request.py / batch_request.py / analyze_tokens.py 共用的工具函数。
+
+Node 每次上传都会启动一次 request.py，所以这里只在顶层导入标准库：
+openai、Pillow、NumPy 都在真正用到时才导入（request.py 的单次请求走标准库 chat_completion，不导入 openai），
+图片质量预检（recognition.quality）也在第一次访问时才加载。
+"""
+
+from .client import chat_completion, create_client, DEFAULT_BASE_URL
+from .images import compress_image, get_image_size_info, image_file_to_data_uri
+from .tokens import estimate_tokens, scale_to_fit
+
+_LAZY_QUALITY = ("assess_image", "filter_images", "DEFAULT_THRESHOLDS")
+
+__all__ = [
+    "chat_completion",
+    "create_client",
+    "DEFAULT_BASE_URL",
+    "compress_image",
+    "get_image_size_info",
+    "image_file_to_data_uri",
+    "estimate_tokens",
+    "scale_to_fit",
+    *_LAZY_QUALITY,
+]
+
+
+def __getattr__(name):
+    # 质量预检依赖 NumPy，只在第一次访问时导入
+    if name in _LAZY_QUALITY:
+        from . import quality
+        return getattr(quality, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
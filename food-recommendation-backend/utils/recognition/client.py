@@ -0,0 +1,53 @@
+"""识别接口客户端"""
+
+import json
+import os
+
+# 可以通过环境变量 DASHSCOPE_BASE_URL 指向其他兼容接口（如本地测试服务）
+DEFAULT_BASE_URL = os.getenv("DASHSCOPE_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+DEFAULT_TIMEOUT = 120
+
+
+def create_client(api_key: str = None, base_url: str = DEFAULT_BASE_URL):
+    """
+    创建 OpenAI 兼容的客户端（从环境变量 DASHSCOPE_API_KEY 读取 API Key）
+
+    openai 包导入较慢，放在函数内部，只有真正发送请求时才付出导入开销。
+    """
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=api_key or os.getenv("DASHSCOPE_API_KEY"),
+        base_url=base_url,
+    )
+
+
+def chat_completion(messages: list, model: str, api_key: str = None,
+                    base_url: str = DEFAULT_BASE_URL, timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """
+    用标准库直接调用 /chat/completions，返回解析后的响应 JSON
+
+    单次请求不需要 openai 的重试、流式等功能，而导入 openai 本身要 0.5 秒以上，
+    request.py 每次上传都会冷启动，所以这里只用 urllib。
+    请求失败时抛出 RuntimeError，错误信息包含接口返回的内容。
+    """
+    import urllib.error
+    import urllib.request
+
+    request = urllib.request.Request(
+        base_url.rstrip("/") + "/chat/completions",
+        data=json.dumps({"model": model, "messages": messages}).encode("utf-8"),
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key or os.getenv('DASHSCOPE_API_KEY')}",
+        },
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        body = e.read().decode("utf-8", errors="replace")
+        raise RuntimeError(f"HTTP {e.code}: {body}") from e
+    except urllib.error.URLError as e:
+        raise RuntimeError(f"连接失败: {e.reason}") from e
@@ -0,0 +1,79 @@
+"""图片读取、压缩与编码"""
+
+import base64
+import io
+import mimetypes
+import os
+
+from .tokens import scale_to_fit
+
+
+def compress_image(image_path: str, max_size: int = 1024, quality: int = 85) -> bytes:
+    """
+    压缩图片以减少token消耗
+    
+    Args:
+        image_path: 图片路径
+        max_size: 最大尺寸（宽或高）
+        quality: JPEG质量（1-100）
+    
+    Returns:
+        压缩后的图片字节数据
+    """
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        # 转换为RGB（如果是RGBA）
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGB')
+        
+        # 计算新尺寸
+        new_size = scale_to_fit(img.width, img.height, max_size)
+        if new_size != img.size:
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        
+        # 保存为字节流
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=quality, optimize=True)
+        return buffer.getvalue()
+
+
+def image_file_to_data_uri(path: str, compress: bool = False, max_size: int = 1024) -> str:
+    """把本地图片读为 base64 data URI，可选压缩，返回字符串，例如：
+    data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/...
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"文件未找到: {path}")
+    
+    if compress:
+        # 使用压缩后的图片数据
+        image_data = compress_image(path, max_size)
+        mime_type = "image/jpeg"
+    else:
+        # 使用原始图片数据
+        with open(path, "rb") as f:
+            image_data = f.read()
+        mime_type, _ = mimetypes.guess_type(path)
+        if mime_type is None:
+            mime_type = "application/octet-stream"
+    
+    b64 = base64.b64encode(image_data).decode("ascii")
+    return f"data:{mime_type};base64,{b64}"
+
+
+def get_image_size_info(path: str) -> dict:
+    """获取图片尺寸信息"""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            file_size = os.path.getsize(path)
+            return {
+                "width": width,
+                "height": height,
+                "file_size": file_size,
+                "format": img.format
+            }
+    except Exception:
+        return {"error": "无法读取图片信息"}
@@ -0,0 +1,223 @@
+"""
+图片质量预检 - 在调用识别接口之前本地过滤模糊、过暗/过曝或不像菜单的图片
+
+用法（在 utils 目录下）：
+    python -m recognition.quality <folder_path|image_path>
+
+检测指标：
+- sharpness: 灰度图拉普拉斯算子响应的方差，越小越模糊
+- brightness: 平均亮度（0-255）
+- clipped_ratio: 接近纯黑或纯白的像素占比，过大说明欠曝/过曝
+- text_density: 含有密集边缘（文字笔画）的小块占比，菜单图片通常较高；
+  边缘阈值按图片对比度缩放，光线暗但字迹清楚的菜单不会被误判为非菜单
+
+所有计算都在缩小后的灰度图上完成，单张图片耗时为毫秒级，
+远低于一次识别请求的耗时和费用。
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+
+# 默认阈值，可通过 assess_image / filter_images 的 thresholds 参数覆盖
+DEFAULT_THRESHOLDS = {
+    "min_sharpness": 60.0,
+    "min_brightness": 40.0,
+    "max_brightness": 225.0,
+    "max_clipped_ratio": 0.6,
+    "min_text_density": 0.05,
+}
+
+# 分析前把图片缩小到的最大边长
+ANALYSIS_MAX_SIZE = 1024
+# 判断为“边缘像素”的梯度阈值（|gx| + |gy|，0-255 灰度），用于满对比度的图片
+EDGE_THRESHOLD = 40
+# 对比度缩放的下限，避免低对比度图片中的噪点被当成文字
+MIN_EDGE_SCALE = 0.15
+# 文字密度统计的小块边长
+TILE_SIZE = 32
+# 小块内边缘像素占比超过该值时视为包含文字
+TILE_EDGE_RATIO = 0.04
+
+
+def load_grayscale(image_path: str, max_size: int = ANALYSIS_MAX_SIZE) -> np.ndarray:
+    """读取图片为缩小后的 float32 灰度矩阵"""
+    with Image.open(image_path) as img:
+        # draft 让 JPEG 解码器直接按缩小比例解码，大图可以省掉大部分解码时间
+        img.draft("L", (max_size, max_size))
+        img = img.convert("L")
+        if max(img.size) > max_size:
+            img.thumbnail((max_size, max_size), Image.Resampling.BILINEAR)
+        return np.asarray(img, dtype=np.float32)
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """4 邻域拉普拉斯算子响应的方差"""
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    lap = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4.0 * gray[1:-1, 1:-1]
+    )
+    return float(lap.var())
+
+
+def exposure_stats(gray: np.ndarray) -> tuple:
+    """返回 (平均亮度, 过暗或过曝像素占比)"""
+    if gray.size == 0:
+        return 0.0, 1.0
+    clipped = np.count_nonzero((gray <= 10) | (gray >= 245))
+    return float(gray.mean()), float(clipped / gray.size)
+
+
+def edge_threshold(gray: np.ndarray) -> float:
+    """
+    按对比度（1% 与 99% 分位亮度之差）缩放的边缘阈值
+
+    曝光不足时文字笔画的梯度按同样比例变小，固定阈值会把整张菜单判为没有文字；
+    过暗本身由亮度检查负责。分位数在隔 4 行 4 列采样的像素上计算。
+    """
+    if gray.size == 0:
+        return float(EDGE_THRESHOLD)
+    low, high = np.percentile(gray[::4, ::4], (1, 99))
+    scale = min(max((high - low) / 255.0, MIN_EDGE_SCALE), 1.0)
+    return EDGE_THRESHOLD * scale
+
+
+def text_density(gray: np.ndarray, tile: int = TILE_SIZE) -> float:
+    """
+    估算文字密度：把图片切成 tile x tile 的小块，
+    统计边缘像素占比超过 TILE_EDGE_RATIO 的小块比例
+    """
+    h, w = gray.shape
+    if h < 2 or w < 2:
+        return 0.0
+    gx = np.abs(np.diff(gray, axis=1))[:-1, :]
+    gy = np.abs(np.diff(gray, axis=0))[:, :-1]
+    edges = (gx + gy) > edge_threshold(gray)
+
+    rows = edges.shape[0] // tile
+    cols = edges.shape[1] // tile
+    if rows == 0 or cols == 0:
+        return float(edges.mean() > TILE_EDGE_RATIO)
+
+    blocks = edges[:rows * tile, :cols * tile].reshape(rows, tile, cols, tile)
+    block_ratio = blocks.mean(axis=(1, 3))
+    return float(np.count_nonzero(block_ratio > TILE_EDGE_RATIO) / block_ratio.size)
+
+
+def assess_image(image_path: str, thresholds: dict = None) -> dict:
+    """
+    计算单张图片的质量指标并判断是否值得发送识别请求
+
+    Returns:
+        {"path", "passed", "reasons", "metrics", "width", "height"}，
+        读取失败时 passed 为 False，reasons 中包含错误信息
+    """
+    limits = dict(DEFAULT_THRESHOLDS)
+    if thresholds:
+        limits.update(thresholds)
+
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+        gray = load_grayscale(image_path)
+    except Exception as e:
+        return {
+            "path": image_path,
+            "passed": False,
+            "reasons": [f"无法读取图片: {e}"],
+            "metrics": {},
+        }
+
+    sharpness = laplacian_variance(gray)
+    brightness, clipped_ratio = exposure_stats(gray)
+    density = text_density(gray)
+
+    reasons = []
+    if sharpness < limits["min_sharpness"]:
+        reasons.append(f"图片模糊 (清晰度 {sharpness:.1f} < {limits['min_sharpness']})")
+    if brightness < limits["min_brightness"]:
+        reasons.append(f"图片过暗 (亮度 {brightness:.1f} < {limits['min_brightness']})")
+    if brightness > limits["max_brightness"]:
+        reasons.append(f"图片过亮 (亮度 {brightness:.1f} > {limits['max_brightness']})")
+    if clipped_ratio > limits["max_clipped_ratio"]:
+        reasons.append(f"曝光异常 (溢出像素 {clipped_ratio:.0%} > {limits['max_clipped_ratio']:.0%})")
+    if density < limits["min_text_density"]:
+        reasons.append(f"疑似非菜单图片 (文字密度 {density:.2f} < {limits['min_text_density']})")
+
+    return {
+        "path": image_path,
+        "passed": not reasons,
+        "reasons": reasons,
+        "width": width,
+        "height": height,
+        "metrics": {
+            "sharpness": round(sharpness, 2),
+            "brightness": round(brightness, 2),
+            "clipped_ratio": round(clipped_ratio, 4),
+            "text_density": round(density, 4),
+        },
+    }
+
+
+def filter_images(image_paths: list, thresholds: dict = None, workers: int = None) -> tuple:
+    """
+    并行检测一批图片
+
+    Pillow 解码和 NumPy 运算都会释放 GIL，线程池即可吃满多核，
+    同时避免了进程池的启动和序列化开销。
+
+    Returns:
+        (passed, rejected) 两个 assess_image 结果列表，顺序与输入一致
+    """
+    if not image_paths:
+        return [], []
+    workers = workers or min(len(image_paths), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        reports = list(pool.map(lambda p: assess_image(p, thresholds), image_paths))
+
+    passed = [r for r in reports if r["passed"]]
+    rejected = [r for r in reports if not r["passed"]]
+    return passed, rejected
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python -m recognition.quality <folder_path|image_path>")
+        sys.exit(1)
+
+    target = sys.argv[1]
+    if os.path.isdir(target):
+        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+        image_files = [
+            str(p) for p in sorted(Path(target).iterdir())
+            if p.is_file() and p.suffix.lower() in image_extensions
+        ]
+    elif os.path.isfile(target):
+        image_files = [target]
+    else:
+        print(f"❌ 路径不存在: {target}")
+        sys.exit(1)
+
+    passed, rejected = filter_images(image_files)
+    for report in passed + rejected:
+        m = report["metrics"]
+        mark = "✅" if report["passed"] else "⛔"
+        print(f"{mark} {os.path.basename(report['path'])}")
+        if m:
+            print(f"   清晰度: {m['sharpness']} | 亮度: {m['brightness']} | "
+                  f"溢出: {m['clipped_ratio']:.2%} | 文字密度: {m['text_density']}")
+        for reason in report["reasons"]:
+            print(f"   - {reason}")
+
+    print(f"\n📊 通过: {len(passed)} | 未通过: {len(rejected)}")
+
+
+if __name__ == "__main__":
+    main()
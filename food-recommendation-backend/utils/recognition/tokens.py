@@ -0,0 +1,31 @@
+"""Vision API token 估算"""
+
+
+def scale_to_fit(width: int, height: int, max_size: int) -> tuple:
+    """按比例缩放到最长边不超过 max_size，返回 (width, height)"""
+    if max(width, height) <= max_size:
+        return width, height
+    if width > height:
+        return max_size, int(height * max_size / width)
+    return int(width * max_size / height), max_size
+
+
+def estimate_tokens(width: int, height: int) -> int:
+    """
+    估算Vision API的token消耗
+    基于OpenAI的计算方式：图片先resize到fit 2048x2048，然后按512x512块计算
+    """
+    # 调整到2048x2048以内
+    max_dim = max(width, height)
+    if max_dim > 2048:
+        scale = 2048 / max_dim
+        width = int(width * scale)
+        height = int(height * scale)
+    
+    # 计算需要多少个512x512的块
+    tiles_width = (width + 511) // 512
+    tiles_height = (height + 511) // 512
+    total_tiles = tiles_width * tiles_height
+    
+    # 每个tile大约170 tokens，加上固定85 tokens
+    return total_tiles * 170 + 85
@@ -0,0 +1,256 @@
+"""
+识别结果流式读取与格式归一化
+
+支持的输入：
+- parsed_*.json: request.py 保存的解析结果 {"店名": ..., "菜品": [...]}
+- result_*.json: request.py 保存的原始接口响应（choices[0].message.content）
+- extracted_content_*.json: batch_request.py 保存的 [{"image", "content": "```json...```"}]
+- batch_results_*.json: batch_request.py 保存的完整结果 [{"success", "response"}]
+- batch_journal_*.jsonl: batch_request.py 运行过程中逐条追加的日志，可以边写边读
+- content_*.txt: request.py 保存的原始识别文本
+- 旧版 res.json: [{"image", "content": {"店名", "菜品"}}]
+
+JSON 文件使用增量解析：顶层为数组时逐个元素解析和产出，
+内存占用只与单条记录的大小有关，与文件大小无关。
+"""
+
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+# 每次从文件读取的字符数
+CHUNK_SIZE = 64 * 1024
+# batch_request.py 在日志结尾写入的结束标记
+JOURNAL_END_EVENT = "batch_finished"
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_NUMBER_CHARS = "0123456789+-.eE"
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S)
+
+
+def iter_json_stream(fp, chunk_size: int = CHUNK_SIZE):
+    """
+    增量解析 JSON 文件
+
+    顶层为数组时逐个产出数组元素，否则产出整个顶层值。
+    """
+    buf = fp.read(chunk_size)
+    pos = 0
+    eof = not buf
+    in_array = False
+    skip_chars = _WHITESPACE
+
+    while True:
+        # 跳过空白（数组内部同时跳过逗号）
+        while True:
+            while pos < len(buf) and buf[pos] in skip_chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf = fp.read(chunk_size)
+            pos = 0
+            eof = not buf
+
+        if pos >= len(buf):
+            if in_array:
+                raise ValueError("JSON数组未正常结束")
+            return
+
+        if not in_array and buf[pos] == "[":
+            in_array = True
+            skip_chars = _WHITESPACE + ","
+            pos += 1
+            continue
+        if in_array and buf[pos] == "]":
+            return
+
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+                # 值恰好在缓冲区末尾结束时可能是被截断的数字，需要再读一块确认；
+                # 数字后面紧跟 e/./+ 等字符说明在指数或小数部分被截断（如 "-2.5" + "e3"）
+                if not eof and (end == len(buf) or (
+                        isinstance(value, (int, float)) and buf[end] in _NUMBER_CHARS)):
+                    raise ValueError("需要更多数据")
+                break
+            except ValueError:
+                if eof:
+                    raise
+                # 按当前缓冲区大小成倍读取，保证超大记录的解析仍是线性复杂度
+                more = fp.read(max(chunk_size, len(buf) - pos))
+                buf = buf[pos:] + more
+                pos = 0
+                eof = not more
+
+        yield value
+        pos = end
+        if not in_array:
+            return
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
+
+
+def iter_jsonl(fp, follow: bool = False, poll_interval: float = 1.0, idle_timeout: float = None):
+    """
+    逐行读取 JSON Lines 日志
+
+    follow=True 时像 tail -f 一样等待新写入的行，
+    读到结束标记或空闲超过 idle_timeout 秒后停止。
+    """
+    pending = ""
+    idle = 0.0
+    while True:
+        line = fp.readline()
+        if line:
+            idle = 0.0
+            pending += line
+            # 写入方可能只写了半行，等换行符出现后再解析
+            if not pending.endswith("\n") and follow:
+                continue
+            text, pending = pending.strip(), ""
+            if not text:
+                continue
+            record = json.loads(text)
+            if isinstance(record, dict) and record.get("event") == JOURNAL_END_EVENT:
+                return
+            yield record
+        elif not follow:
+            return
+        else:
+            if idle_timeout is not None and idle >= idle_timeout:
+                return
+            time.sleep(poll_interval)
+            idle += poll_interval
+
+
+def extract_content(text: str):
+    """从模型返回的文本中提取 JSON，兼容 markdown 代码块，解析失败返回 None"""
+    if not isinstance(text, str):
+        return text
+    match = _FENCE_RE.search(text)
+    candidate = match.group(1) if match else text.strip()
+    if not candidate.startswith(("{", "[")):
+        # 有时模型会在 JSON 前后加说明文字
+        starts = [i for i in (candidate.find("{"), candidate.find("[")) if i >= 0]
+        if not starts:
+            return None
+        candidate = candidate[min(starts):]
+    try:
+        value, _ = _decoder.raw_decode(candidate)
+        return value
+    except ValueError:
+        return None
+
+
+def _response_content(response: dict):
+    try:
+        return response.get("choices", [{}])[0].get("message", {}).get("content", "")
+    except (AttributeError, IndexError):
+        return ""
+
+
+def _dish_entries(value):
+    """菜品字段可能是 [{"名称", "价格"}] 列表，也可能是 {菜名: 价格} 字典"""
+    if isinstance(value, list):
+        for dish in value:
+            if isinstance(dish, dict):
+                yield dish.get("名称") or dish.get("菜品名") or dish.get("name"), dish.get("价格", dish.get("price"))
+    elif isinstance(value, dict):
+        for name, price in value.items():
+            if not isinstance(price, (dict, list)):
+                yield name, price
+
+
+def _is_dish_key(key) -> bool:
+    # 模型返回的字段名不固定：菜品 / 菜品及价格 / 菜品价格 / 菜品名价格 ...
+    return isinstance(key, str) and (key.startswith("菜品") or key == "dishes")
+
+
+def _normalize_menu(menu: dict, image: str = "") -> dict:
+    dishes = []
+    for key, value in menu.items():
+        if not _is_dish_key(key):
+            continue
+        for name, price in _dish_entries(value):
+            if not name:
+                continue
+            dishes.append({
+                "name": str(name).strip(),
+                # 价格可能是数字也可能是 "小份10元，大份12元" 这样的文本
+                "price_text": "" if price is None else str(price),
+            })
+    return {
+        "name": menu.get("店名") or menu.get("restaurant_name") or menu.get("name") or "未知餐厅",
+        "image": image,
+        "dishes": dishes,
+    }
+
+
+def normalize_record(record, image: str = "") -> list:
+    """
+    把任意一种识别结果记录转换为统一格式的餐厅列表：
+        [{"name": 店名, "image": 图片名, "dishes": [{"name", "price_text"}]}]
+    无法识别的记录返回空列表。
+    """
+    if not isinstance(record, dict):
+        if isinstance(record, list):
+            return [r for item in record for r in normalize_record(item, image)]
+        return []
+
+    if "response" in record:
+        # batch_results_*.json
+        if not record.get("success"):
+            return []
+        image = os.path.basename(record.get("image_path", "")) or image
+        return normalize_record(extract_content(_response_content(record["response"])), image)
+
+    if "choices" in record:
+        # result_*.json
+        return normalize_record(extract_content(_response_content(record)), image)
+
+    if "content" in record:
+        # extracted_content_*.json / batch_journal_*.jsonl / 旧版 res.json
+        return normalize_record(extract_content(record["content"]), record.get("image", image))
+
+    if "店名" in record or any(_is_dish_key(key) for key in record):
+        return [_normalize_menu(record, image)]
+
+    return []
+
+
+def expand_paths(paths: list) -> list:
+    """目录展开为其中的 parsed_*.json 和 extracted_content_*.json"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            folder = Path(path)
+            files.extend(str(p) for p in sorted(folder.glob("parsed_*.json")))
+            files.extend(str(p) for p in sorted(folder.glob("extracted_content_*.json")))
+        else:
+            files.append(path)
+    return files
+
+
+def iter_restaurants(paths: list, follow: bool = False, idle_timeout: float = None):
+    """依次流式读取各个文件，产出归一化后的餐厅记录，没有菜品的记录打印警告后跳过"""
+    for path in expand_paths(paths):
+        # parsed_<图片名>_<时间戳>.json -> <图片名>
+        image = re.sub(r"^(?:parsed|result|content)_(.*?)(?:_\d{8}_\d{6})?$", r"\1", Path(path).stem)
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                records = iter_jsonl(f, follow=follow, idle_timeout=idle_timeout)
+            elif path.endswith(".txt"):
+                records = [{"content": f.read(), "image": image}]
+            else:
+                records = iter_json_stream(f)
+            for record in records:
+                # 单文件结果（parsed_/result_）本身不带图片名，用文件名代替
+                for restaurant in normalize_record(record, image):
+                    if not restaurant["dishes"]:
+                        print(f"⚠️  {restaurant['image'] or path}: {restaurant['name']} 未识别到菜品，已跳过")
+                        continue
+                    yield restaurant
@@ -1,38 +1,42 @@
 import os
 import sys
-import base64
-import mimetypes
 import json
 from datetime import datetime
-from openai import OpenAI
+
+from recognition import chat_completion, image_file_to_data_uri
 
 """
 用法：
-    python request.py /path/to/image.jpg
+    python request.py /path/to/image.jpg [--skip-quality-check]
 
 脚本功能：
+- 在本地检查图片质量，模糊、过暗或不像菜单的图片直接退出，不发送请求
 - 将本地图片文件编码为 base64 data URI
-- 调用 OpenAI 兼容的 client（已在顶部的 client 示例中使用）发送一个包含图片和问题的 multimodal 请求
+- 调用 OpenAI 兼容的 /chat/completions 接口发送一个包含图片和问题的 multimodal 请求
 
 注意：
 - 请通过环境变量 DASHSCOPE_API_KEY 配置 API Key，或者在代码中直接填写 api_key。
 - 该脚本不会对 API 返回做复杂解析，仅打印结果。
+- Node 每次上传都会启动本脚本，请求直接用标准库 urllib 发送，不导入 openai；
+  Pillow / NumPy 只在质量预检时导入。
 """
 
 
-def image_file_to_data_uri(path: str) -> str:
-    """把本地图片读为 base64 data URI，返回字符串，例如：
-    data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/...
-    """
-    if not os.path.isfile(path):
-        raise FileNotFoundError(f"文件未找到: {path}")
-    mime_type, _ = mimetypes.guess_type(path)
-    if mime_type is None:
-        mime_type = "application/octet-stream"
-    with open(path, "rb") as f:
-        b = f.read()
-    b64 = base64.b64encode(b).decode("ascii")
-    return f"data:{mime_type};base64,{b64}"
+def check_image_quality(image_path: str) -> bool:
+    """本地质量预检，未安装 Pillow/NumPy 时跳过检查"""
+    try:
+        from recognition.quality import assess_image
+    except ImportError as e:
+        print(f"⚠️  未安装质量预检依赖，跳过检查: {e}", file=sys.stderr)
+        return True
+
+    report = assess_image(image_path)
+    print(f"Debug: quality = {report['metrics']}", file=sys.stderr)
+    if not report["passed"]:
+        print("⛔ 图片未通过质量预检，未发送识别请求:", file=sys.stderr)
+        for reason in report["reasons"]:
+            print(f"   - {reason}", file=sys.stderr)
+    return report["passed"]
 
 
 def main():
@@ -52,11 +56,8 @@ def main():
     print(f"Debug: exists = {os.path.exists(image_path)}", file=sys.stderr)
     print(f"Debug: isfile = {os.path.isfile(image_path)}", file=sys.stderr)
 
-    # 准备客户端（从环境变量读取 API Key）
-    client = OpenAI(
-        api_key=os.getenv("DASHSCOPE_API_KEY"),
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-    )
+    if "--skip-quality-check" not in sys.argv and not check_image_quality(image_path):
+        sys.exit(2)
 
     data_uri = image_file_to_data_uri(image_path)
 
@@ -67,13 +68,14 @@ def main():
 
     print("已准备好请求，正在发送...")
     try:
-        completion = client.chat.completions.create(
+        # 从环境变量 DASHSCOPE_API_KEY 读取 API Key
+        completion = chat_completion(
             model="qwen3-vl-plus",
             messages=[{"role": "user", "content": messages}],
         )
         
         # 获取返回的JSON数据
-        response_json = completion.model_dump_json()
+        response_json = json.dumps(completion, ensure_ascii=False)
         print("API返回结果:")
         print(response_json)
         